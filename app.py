@@ -1,14 +1,28 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory, session, redirect, url_for
+from startup import Startup
+from flask import Flask, render_template, request, jsonify, send_from_directory, session, redirect, url_for, abort, g
 from git_operations import GitOperations 
+from git_sync import GitSync
+from git_maintenance import GitMaintenance
+from git_push_queue import GitPushQueue
 from portfolio_manager import PortfolioManager
+from portfolio_batch import PortfolioBatch
+from ingest_jobs import IngestJobs
+from upload_sessions import UploadSessions, UploadSessionError
+from metrics import Metrics
+from response_compression import ResponseCompression
 from dotenv import load_dotenv
 import os
-import threading 
+import hashlib
+import hmac
+import time
 from functools import wraps
+from werkzeug.utils import safe_join
 
 load_dotenv()
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'your-secret-key-change-this')
+# Key order carries no meaning in the API; sorting every key of the listing costs serialization time.
+app.json.sort_keys = False
 
 # Debug: Print loaded environment variables
 print("=== Environment Variables ===")
@@ -19,6 +33,34 @@ print(f"GITHUB_REPO_NAME: {os.environ.get('GITHUB_REPO_NAME', 'Not set')}")
 print(f"ADMIN_PASSWORD: {'Set' if os.environ.get('ADMIN_PASSWORD') else 'Not set'}")
 print("============================")
 
+# --- Request metrics ---
+def record_request(status):
+    if getattr(g, 'metrics_recorded', True):
+        return
+    g.metrics_recorded = True
+    route = request.url_rule.rule if request.url_rule else '<unmatched>'
+    Metrics.observe('portfolio_http_request_duration_seconds', time.perf_counter() - g.request_start,
+                    {'route': route, 'method': request.method, 'status': str(status)})
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.metrics_recorded = False
+
+@app.after_request
+def observe_request(response):
+    record_request(response.status_code)
+    return response
+
+@app.after_request
+def compress_response(response):
+    return ResponseCompression.apply(response)
+
+@app.teardown_request
+def observe_failed_request(error):
+    if error is not None:
+        record_request(500)
+
 # Login required decorator
 def login_required(f):
     @wraps(f)
@@ -28,6 +70,15 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Routes that modify the website repo wait for the startup clone
+def repo_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not os.path.exists(GitOperations.REPO_PATH):
+            return jsonify({'success': False, 'message': '儲存庫仍在下載中，請稍後再試'}), 503
+        return f(*args, **kwargs)
+    return decorated_function
+
 # --- Login Routes ---
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -51,49 +102,50 @@ def logout():
     session.pop('logged_in', None)
     return redirect(url_for('login'))
 
-# --- Helper for Background Git Push ---
-def run_git_push(commit_message):
-    """Runs add, commit, push in a background thread."""
-    print(f"Background task started: Pushing changes for '{commit_message}'")
-    if not os.path.exists(GitOperations.REPO_PATH):
-        print("Repository not found locally, skipping push.")
-        return
-
-    pull_success, pull_msg = GitOperations.pull()
-    if not pull_success:
-        print(f"Pull before push failed: {pull_msg}. Attempting push anyway...")
+# --- Static File Route ---
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
 
-    success, message = GitOperations.add_commit_push(commit_message)
-    if success:
-        print(f"Background task finished: Successfully pushed '{commit_message}'. Message: {message}")
+def send_cached_image(directory, filename, content_hash, etag=None):
+    """send_from_directory with a strong ETag from the stored content hash (304 and
+    Range requests are handled by Werkzeug). URLs carrying the current ?v= token
+    never change content, so they are cached as immutable; anything else revalidates."""
+    versioned = content_hash is not None and request.args.get('v') == content_hash
+    response = send_from_directory(
+        directory, filename,
+        etag=etag or content_hash or True,
+        conditional=True,
+        max_age=IMMUTABLE_MAX_AGE if versioned else 0,
+    )
+    if versioned:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
     else:
-        print(f"Background task finished: Failed to push '{commit_message}'. Error: {message}")
+        response.cache_control.no_cache = True
+    return response
 
-# --- Static File Route ---
 @app.route('/assets/<path:filename>')
 def serve_static(filename):
-    return send_from_directory(
-        os.path.join(PortfolioManager.BASE_DIR, 'assets'), 
-        filename
-    )
+    assets_dir = os.path.abspath(os.path.join(PortfolioManager.BASE_DIR, 'assets'))
+    file_path = safe_join(assets_dir, filename)
+    if not file_path or not os.path.isfile(file_path):
+        abort(404)
+    return send_cached_image(assets_dir, filename, PortfolioManager.get_content_hash(file_path))
+
+@app.route('/derivatives/<size_name>/<folder_name>/<filename>')
+def serve_derivative(size_name, folder_name, filename):
+    path = PortfolioManager.get_derivative(size_name, folder_name, filename)
+    if not path:
+        abort(404)
+    source_hash = PortfolioManager.get_content_hash(os.path.join(PortfolioManager._portfolio_root(), folder_name, filename))
+    return send_cached_image(os.path.dirname(path), os.path.basename(path), source_hash,
+                             etag=f"{source_hash}-{size_name}" if source_hash else None)
 
 # --- Page Routes ---
 @app.route('/')
 @login_required
 def index():
-    # Pull latest changes before loading the page
-    print("Pulling latest changes from GitHub...")
-    pull_success, pull_msg = GitOperations.pull()
-    if pull_success:
-        print(f"Successfully pulled latest changes: {pull_msg}")
-    else:
-        print(f"Pull failed: {pull_msg}")
-    
-    if not os.path.exists(GitOperations.REPO_PATH):
-        print("Repository not found locally, attempting to clone...")
-        clone_success, clone_msg = GitOperations.clone()
-        if not clone_success:
-            print(f"Initial clone failed: {clone_msg}")
+    # Render from the local clone; the background service fetches/pulls (or clones) on its own.
+    GitSync.request_sync()
     return render_template('portfolio.html')
 
 @app.route('/git')
@@ -105,14 +157,83 @@ def git_operations():
 @app.route('/api/portfolio', methods=['GET'])
 @login_required
 def get_portfolio():
+    """Optional query args: type, area, date_from, date_to, sort ([-]folder_num|date|name),
+    offset, limit, cursor, view (full|summary: cover and image_count instead of images).
+    Without any of them the full list is returned as before."""
+    return portfolio_listing(search=False)
+
+@app.route('/api/portfolio/search', methods=['GET'])
+@login_required
+def search_portfolio():
+    """q (full-text over name, description, 區域 and 種類) plus the /api/portfolio args;
+    the response adds `facets` with match counts per area and type."""
+    return portfolio_listing(search=True)
+
+def portfolio_listing(search):
     try:
-        items = PortfolioManager.get_portfolio_items()
-        return jsonify({'success': True, 'data': items})
+        keys = ('type', 'area', 'date_from', 'date_to', 'sort', 'offset', 'limit', 'cursor', 'view') + (('q',) if search else ())
+        args = {k: request.args.get(k) for k in keys}
+        query_key = hashlib.sha1(repr(sorted(args.items())).encode('utf-8')).hexdigest()[:8]
+        etag = f"{PortfolioManager.listing_digest()}-{query_key}"
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        cached = ResponseCompression.cached(etag)
+        if cached:
+            return cached
+
+        # type=int yields None for a value that is not an integer; only an absent/empty one may be.
+        offset = request.args.get('offset', type=int)
+        limit = request.args.get('limit', type=int)
+        if (args['offset'] and offset is None) or (offset is not None and offset < 0):
+            return jsonify({'success': False, 'message': "offset 必須是大於或等於 0 的整數"}), 400
+        if (args['limit'] and limit is None) or (limit is not None and limit < 1):
+            return jsonify({'success': False, 'message': "limit 必須是大於 0 的整數"}), 400
+
+        result = PortfolioManager.query_portfolio_items(
+            type=args['type'], area=args['area'], date_from=args['date_from'], date_to=args['date_to'],
+            sort=args['sort'] or '-folder_num',
+            offset=offset or 0,
+            limit=limit,
+            cursor=args['cursor'],
+            q=args.get('q'),
+            facets=search,
+            view=args['view'] or 'full',
+        )
+        body = {'success': True, 'data': result['items'], 'total': result['total'],
+                'offset': result['offset'], 'next_cursor': result['next_cursor']}
+        if search:
+            body['facets'] = result['facets']
+        response = jsonify(body)
+        response.set_etag(f"{result['digest']}-{query_key}")
+        response.cache_control.no_cache = True
+        return response
+    except ValueError as e: # unsupported sort, view or cursor
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/api/portfolio/<folder_name>', methods=['GET'])
+@login_required
+def get_portfolio_item(folder_name):
+    """One project with its full image list (the list view can use view=summary)."""
+    etag = f"{PortfolioManager.listing_digest()}-{folder_name}"
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    item = PortfolioManager.get_portfolio_item(folder_name)
+    if not item:
+        return jsonify({'success': False, 'message': f"找不到作品 {folder_name}"}), 404
+    response = jsonify({'success': True, 'data': item})
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
 @app.route('/api/portfolio/upload', methods=['POST'])
 @login_required
+@repo_required
 def upload_portfolio():
     if 'images' not in request.files:
         return jsonify({'success': False, 'message': '缺少圖片檔案'})
@@ -130,19 +251,48 @@ def upload_portfolio():
         "size": request.form.get("size", ""),
         "type": request.form.get("type", "")
     }
-    
-    success, message = PortfolioManager.create_new_portfolio(valid_files, description_data)
-    
-    if success:
+
+    # Spool to disk and return immediately; the job reserves the folder, converts and then pushes.
+    job_id, spooled = IngestJobs.spool(valid_files)
+    job = submit_create_job(job_id, spooled, description_data)
+    return jsonify({'success': True, 'job_id': job_id, 'job': job,
+                    'message': f"已接收 {len(spooled)} 張圖片，正在背景處理..."}), 202
+
+# --- Ingest jobs, shared by the multipart routes and finalized upload sessions ---
+def submit_create_job(job_id, spooled, description_data):
+    def task(files, progress):
+        folder_name = PortfolioManager.reserve_portfolio_folder()
+        success, message = PortfolioManager.create_new_portfolio(files, description_data, folder_name=folder_name, progress=progress)
+        return success, message, folder_name
+
+    def on_success(folder_name):
         commit_message = f"Add portfolio: {description_data.get('project_name', 'New Portfolio')}"
-        thread = threading.Thread(target=run_git_push, args=(commit_message,))
-        thread.start()
-        message += " (正在背景上傳到 GitHub...)" 
+        GitPushQueue.enqueue(commit_message, PortfolioManager.pop_changed_paths())
+        return " (正在背景上傳到 GitHub...)"
 
-    return jsonify({'success': success, 'message': message})
+    return IngestJobs.submit(job_id, 'create', spooled, task, on_success)
+
+def submit_update_job(job_id, spooled, folder_name, update_data):
+    def task(files, progress):
+        final_success, final_message, _ = apply_portfolio_update(folder_name, update_data, files, progress)
+        return final_success, final_message, folder_name
+
+    return IngestJobs.submit(job_id, 'update', spooled, task, lambda _: push_portfolio_update(folder_name, update_data))
+
+def submit_add_job(job_id, spooled, folder_name):
+    def task(files, progress):
+        success, message = PortfolioManager.add_portfolio_images(folder_name, files, progress)
+        return success, message, folder_name
+
+    def on_success(_):
+        GitPushQueue.enqueue(f"Add images to portfolio: {folder_name}", PortfolioManager.pop_changed_paths())
+        return " (正在背景上傳到 GitHub...)"
+
+    return IngestJobs.submit(job_id, 'add_images', spooled, task, on_success)
 
 @app.route('/api/portfolio/update', methods=['POST']) 
 @login_required
+@repo_required
 def update_portfolio():
     folder_name = request.form.get('folder_name')
     if not folder_name:
@@ -156,40 +306,175 @@ def update_portfolio():
         "type": request.form.get("type", "")
     }
 
-    image_replace_success = True
-    image_replace_message = ""
-    images_replaced = False
-    
+    valid_files = []
     if 'images' in request.files:
         uploaded_files = request.files.getlist('images')
         valid_files = [f for f in uploaded_files if f and f.filename != '' and (f.filename.lower().endswith('.jpg') or f.filename.lower().endswith('.webp'))]
-        if valid_files: 
-            images_replaced = True
-            print(f"Replacing images for {folder_name}...")
-            image_replace_success, image_replace_message = PortfolioManager.replace_portfolio_images(folder_name, valid_files)
-            if not image_replace_success:
-                 print(f"Image replacement failed for {folder_name}: {image_replace_message}")
-        else:
+        if not valid_files:
             print(f"No valid new image files provided for replacement in {folder_name}.")
 
+    if not valid_files:
+        # Description-only edits are cheap; keep them synchronous.
+        final_success, final_message, should_push = apply_portfolio_update(folder_name, update_data, [])
+        if should_push:
+            final_message += push_portfolio_update(folder_name, update_data)
+        return jsonify({'success': final_success, 'message': final_message})
+
+    job_id, spooled = IngestJobs.spool(valid_files)
+    job = submit_update_job(job_id, spooled, folder_name, update_data)
+    return jsonify({'success': True, 'job_id': job_id, 'job': job,
+                    'message': f"已接收 {len(spooled)} 張圖片，正在背景處理..."}), 202
+
+def apply_portfolio_update(folder_name, update_data, files, progress=None):
+    """Replace images (if any) and update the description. Returns (success, message, should_push)."""
+    image_replace_success = True
+    image_replace_message = ""
+    if files:
+        print(f"Replacing images for {folder_name}...")
+        image_replace_success, image_replace_message = PortfolioManager.replace_portfolio_images(folder_name, files, progress)
+        if not image_replace_success:
+             print(f"Image replacement failed for {folder_name}: {image_replace_message}")
+
     desc_update_success, desc_update_message = PortfolioManager.update_description_entry(folder_name, update_data)
 
-    final_success = desc_update_success 
     final_message = desc_update_message
-    if image_replace_message: 
+    if not image_replace_success:
+        final_message = f"圖片替換失敗: {image_replace_message}，未上傳到 GitHub。{desc_update_message}"
+    elif image_replace_message:
         final_message += f" 圖片替換狀態: {image_replace_message}"
+    # A half-replaced image set must not be published, even if the description was saved.
+    success = image_replace_success and desc_update_success
+    return success, final_message, success
+
+def push_portfolio_update(folder_name, update_data):
+    commit_message = f"Update portfolio: {folder_name} ({update_data.get('project_name', '')})"
+    GitPushQueue.enqueue(commit_message, PortfolioManager.pop_changed_paths())
+    return " (正在背景上傳到 GitHub...)"
 
-    if desc_update_success or (images_replaced and image_replace_success):
-         commit_message = f"Update portfolio: {folder_name} ({update_data.get('project_name', '')})"
-         thread = threading.Thread(target=run_git_push, args=(commit_message,))
-         thread.start()
-         final_message += " (正在背景上傳到 GitHub...)"
+# --- Per-image Routes ---
+@app.route('/api/portfolio/images/add', methods=['POST'])
+@login_required
+@repo_required
+def add_portfolio_images():
+    folder_name = request.form.get('folder_name')
+    if not folder_name:
+        return jsonify({'success': False, 'message': '缺少作品集資料夾名稱 (folder_name)'})
+    uploaded_files = request.files.getlist('images')
+    valid_files = [f for f in uploaded_files if f and f.filename != '' and (f.filename.lower().endswith('.jpg') or f.filename.lower().endswith('.webp'))]
+    if not valid_files:
+        return jsonify({'success': False, 'message': '上傳的檔案中沒有有效的JPG或WebP圖片'})
 
-    return jsonify({'success': final_success, 'message': final_message})
+    job_id, spooled = IngestJobs.spool(valid_files)
+    job = submit_add_job(job_id, spooled, folder_name)
+    return jsonify({'success': True, 'job_id': job_id, 'job': job,
+                    'message': f"已接收 {len(spooled)} 張圖片，正在背景處理..."}), 202
+
+# --- Resumable chunked uploads ---
+# POST /api/uploads creates a session, PUT /api/uploads/<id>/files/<n>?offset=N sends the
+# bytes of file n from offset N (raw body), POST /api/uploads/<id>/finalize starts the job.
+def upload_error(e):
+    return jsonify({'success': False, 'message': str(e), 'data': e.session}), e.status
+
+@app.route('/api/uploads', methods=['POST'])
+@login_required
+@repo_required
+def create_upload_session():
+    data = request.json or {}
+    try:
+        session_data = UploadSessions.create(data.get('kind', 'create'), data.get('files') or [],
+                                             data.get('folder_name'), data.get('fields') or {})
+    except UploadSessionError as e:
+        return upload_error(e)
+    return jsonify({'success': True, 'data': session_data}), 201
+
+@app.route('/api/uploads/<session_id>', methods=['GET', 'DELETE'])
+@login_required
+def upload_session(session_id):
+    try:
+        if request.method == 'DELETE':
+            UploadSessions.abort(session_id)
+            return jsonify({'success': True, 'message': '已取消上傳'})
+        return jsonify({'success': True, 'data': UploadSessions.get(session_id)})
+    except UploadSessionError as e:
+        return upload_error(e)
+
+@app.route('/api/uploads/<session_id>/files/<int:index>', methods=['PUT'])
+@login_required
+def upload_chunk(session_id, index):
+    offset = request.args.get('offset', '0')
+    if not offset.isdigit():
+        return jsonify({'success': False, 'message': '位移 (offset) 無效'}), 400
+    try:
+        # request.stream is read in blocks; the body is never buffered whole or form-parsed.
+        session_data = UploadSessions.write_chunk(session_id, index, int(offset), request.stream, request.content_length)
+    except UploadSessionError as e:
+        return upload_error(e)
+    return jsonify({'success': True, 'data': session_data})
+
+@app.route('/api/uploads/<session_id>/finalize', methods=['POST'])
+@login_required
+@repo_required
+def finalize_upload_session(session_id):
+    try:
+        session_data, spooled = UploadSessions.finalize(session_id)
+    except UploadSessionError as e:
+        return upload_error(e)
+    if session_data['status'] == 'claimed':
+        return jsonify({'success': False, 'message': '上傳工作階段已由批次操作使用', 'data': session_data}), 409
+    job_id = session_data['job_id']
+    if spooled is not None:
+        fields = session_data['fields']
+        if session_data['kind'] == 'create':
+            submit_create_job(job_id, spooled, fields)
+        elif session_data['kind'] == 'update':
+            submit_update_job(job_id, spooled, session_data['folder_name'], fields)
+        else:
+            submit_add_job(job_id, spooled, session_data['folder_name'])
+    return jsonify({'success': True, 'job_id': job_id, 'job': IngestJobs.get(job_id),
+                    'message': f"已接收 {len(session_data['files'])} 張圖片，正在背景處理..."}), 202
+
+@app.route('/api/portfolio/images/remove', methods=['POST'])
+@login_required
+@repo_required
+def remove_portfolio_images():
+    data = request.json or {}
+    folder_name = data.get('folder_name')
+    images = data.get('images') or []
+    if not folder_name or not images:
+        return jsonify({'success': False, 'message': '缺少作品集資料夾名稱或要移除的圖片'})
+    success, message = PortfolioManager.remove_portfolio_images(folder_name, images)
+    if success:
+        GitPushQueue.enqueue(f"Remove images from portfolio: {folder_name}", PortfolioManager.pop_changed_paths())
+        message += " (正在背景上傳到 GitHub...)"
+    return jsonify({'success': success, 'message': message})
+
+@app.route('/api/portfolio/images/reorder', methods=['POST'])
+@login_required
+@repo_required
+def reorder_portfolio_images():
+    data = request.json or {}
+    folder_name = data.get('folder_name')
+    order = data.get('order') or []
+    if not folder_name or not order:
+        return jsonify({'success': False, 'message': '缺少作品集資料夾名稱或圖片順序'})
+    success, message = PortfolioManager.reorder_portfolio_images(folder_name, order)
+    if success:
+        GitPushQueue.enqueue(f"Reorder images of portfolio: {folder_name}", PortfolioManager.pop_changed_paths())
+        message += " (正在背景上傳到 GitHub...)"
+    return jsonify({'success': success, 'message': message})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_job(job_id):
+    job = IngestJobs.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': f"找不到工作 {job_id}"}), 404
+    return jsonify({'success': True, 'data': job})
 
 
 @app.route('/api/portfolio/delete', methods=['POST'])
 @login_required
+@repo_required
 def delete_portfolio():
     data = request.json
     folder_name = data.get('folder_name')
@@ -200,18 +485,69 @@ def delete_portfolio():
 
     if success:
         commit_message = f"Delete portfolio: {folder_name}"
-        thread = threading.Thread(target=run_git_push, args=(commit_message,))
-        thread.start()
+        GitPushQueue.enqueue(commit_message, PortfolioManager.pop_changed_paths())
         message += " (正在背景上傳到 GitHub...)" 
 
     return jsonify({'success': success, 'message': message})
 
+@app.route('/api/portfolio/batch', methods=['POST'])
+@login_required
+@repo_required
+def batch_portfolio():
+    """{"operations": [...]} (see portfolio_batch.py); all changes go out as one commit."""
+    operations = (request.json or {}).get('operations')
+    success, message, results = PortfolioBatch.apply(operations)
+    applied = [r for r in results if r['success']]
+    if applied:
+        GitPushQueue.enqueue(PortfolioBatch.commit_messages(operations, results), PortfolioManager.pop_changed_paths())
+        message += " (正在背景上傳到 GitHub...)"
+    return jsonify({'success': success, 'message': message, 'results': results}), 200 if applied else 400
+
+# --- Metrics ---
+@app.route('/healthz')
+def healthz():
+    return jsonify({'success': True, 'status': 'alive'})
+
+@app.route('/readyz')
+def readyz():
+    status = Startup.status()
+    status['repo_present'] = os.path.exists(GitOperations.REPO_PATH)
+    return jsonify({'success': status['ready'], 'data': status}), 200 if status['ready'] else 503
+
+@app.route('/metrics')
+def metrics():
+    # Scrapers cannot log in; set METRICS_TOKEN to require "Authorization: Bearer <token>".
+    token = os.getenv('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        abort(401)
+    return app.response_class(Metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 # --- Git API Routes ---
+@app.route('/api/git/queue', methods=['GET'])
+@login_required
+def git_queue():
+    return jsonify({'success': True, 'data': GitPushQueue.status()})
+
+@app.route('/api/git/sync', methods=['GET', 'POST'])
+@login_required
+def git_sync():
+    if request.method == 'POST':
+        GitSync.request_sync()
+    return jsonify({'success': True, 'data': GitSync.status()})
+
+@app.route('/api/git/maintenance', methods=['GET', 'POST'])
+@login_required
+def git_maintenance():
+    if request.method == 'POST':
+        GitMaintenance.request_run()
+    return jsonify({'success': True, 'data': GitMaintenance.status()})
+
 @app.route('/api/git/clone', methods=['POST'])
 @login_required
 def git_clone():
     try:
-        success, message = GitOperations.clone()
+        with GitOperations.REPO_LOCK:
+            success, message = GitOperations.clone()
         return jsonify({'success': success, 'message': message})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
@@ -220,7 +556,8 @@ def git_clone():
 @login_required
 def git_pull():
     try:
-        success, message = GitOperations.pull()
+        with GitOperations.REPO_LOCK:
+            success, message = GitOperations.pull()
         return jsonify({'success': success, 'message': message})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
@@ -231,7 +568,8 @@ def git_add():
     try:
         data = request.json
         files = data.get('files', '.')
-        success, message = GitOperations.add(files)
+        with GitOperations.REPO_LOCK:
+            success, message = GitOperations.add(files)
         return jsonify({'success': success, 'message': message})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
@@ -244,7 +582,8 @@ def git_commit():
         message = data.get('message', '')
         if not message:
             return jsonify({'success': False, 'message': '請輸入 commit 訊息'})
-        success, message = GitOperations.commit(message)
+        with GitOperations.REPO_LOCK:
+            success, message = GitOperations.commit(message)
         return jsonify({'success': success, 'message': message})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
@@ -253,21 +592,20 @@ def git_commit():
 @login_required
 def git_push():
     try:
-        success, message = GitOperations.push()
+        with GitOperations.REPO_LOCK:
+            success, message = GitOperations.push()
         return jsonify({'success': success, 'message': message})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
 # --- Main Execution ---
+Startup.imports_done()
+
 if __name__ == '__main__':
-    if not os.path.exists(GitOperations.REPO_PATH):
-        print("Repository not found locally on startup, attempting to clone...")
-        clone_success, clone_msg = GitOperations.clone()
-        if not clone_success:
-            print(f"Initial clone failed: {clone_msg}")
-        else:
-             print(f"Initial clone successful.")
-             
+    # Clone (if needed), build the index, then start GitSync and GitMaintenance, all in the
+    # background: the port is bound right away and /readyz reports when the app is ready.
+    Startup.start()
+
     # Bind to 0.0.0.0 to be accessible from outside the container
     # Use os.environ.get('PORT', 5000) for flexibility if needed later
     port = int(os.environ.get("PORT", 8080))
@@ -0,0 +1,289 @@
+"""Benchmarks for the PortfolioManager and GitOperations hot paths.
+
+Builds synthetic website repos (N wN folders plus a matching
+portfolio_description.json) with a local bare repository standing in for
+GitHub, times the listing, description, image and git paths, and prints the
+results as JSON so runs can be compared.
+
+    python benchmarks/bench_portfolio.py --sizes 10,1000,10000 --output bench.json
+"""
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def measure(fn, repeat, setup=None, warmup=0):
+    """Run fn() `repeat` times (after `warmup` untimed runs), calling setup() untimed before each."""
+    samples = []
+    for run in range(warmup + repeat):
+        if setup:
+            with contextlib.redirect_stdout(io.StringIO()):
+                setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - start
+        if isinstance(result, tuple) and result and result[0] is False:
+            raise RuntimeError(f"{getattr(fn, '__name__', fn)} failed: {result[1]}")
+        if run >= warmup:
+            samples.append(elapsed)
+    return {
+        'runs': len(samples),
+        'min_ms': round(min(samples) * 1000, 3),
+        'median_ms': round(statistics.median(samples) * 1000, 3),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 3),
+    }
+
+
+def git(cwd, *args):
+    from git_operations import GitOperations
+    subprocess.run(['git'] + GitOperations.COMMIT_IDENTITY + list(args), cwd=cwd, check=True, capture_output=True)
+
+
+def tiny_webp():
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), (180, 160, 140)).save(buf, "WEBP", quality=75)
+    return buf.getvalue()
+
+
+def sample_jpegs(count, width, height):
+    """0.jpg is a line-drawing floor plan, the rest are gradient photos with sensor-like noise."""
+    from PIL import Image, ImageDraw
+    images = []
+    plan = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(plan)
+    draw.rectangle([width // 8, height // 8, width * 7 // 8, height * 7 // 8], outline="black", width=6)
+    draw.line([width // 2, height // 8, width // 2, height * 7 // 8], fill="black", width=3)
+    buf = io.BytesIO()
+    plan.save(buf, "JPEG", quality=90)
+    images.append(("0.jpg", buf.getvalue()))
+    for idx in range(1, count):
+        bands = [Image.linear_gradient("L").rotate(90 * (idx + band)).resize((width, height)) for band in range(3)]
+        noise = Image.effect_noise((width, height), 8 + idx).convert("RGB")
+        photo = Image.blend(Image.merge("RGB", bands), noise, 0.15)
+        buf = io.BytesIO()
+        photo.save(buf, "JPEG", quality=90)
+        images.append((f"{idx}.jpg", buf.getvalue()))
+    return images
+
+
+class Upload:
+    """Minimal FileStorage stand-in (filename + read())."""
+    def __init__(self, filename, data):
+        self.filename = filename
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+def description(folder_num):
+    return {
+        "專案名": f"測試作品 {folder_num}",
+        "圖片連結": f"./assets/img/portfolio/w{folder_num}/",
+        "描述": "基準測試用的作品描述。" * 4,
+        "區域": ["台北", "新北", "桃園", "台中"][folder_num % 4],
+        "日期": f"{2015 + folder_num % 10}/{folder_num % 12 + 1}",
+        "坪數": str(20 + folder_num % 50),
+        "種類": ["住宅", "商業空間", "辦公室"][folder_num % 3],
+    }
+
+
+def build_site(workdir, folders, webp, images=1):
+    """Create site/ (working clone), remote.git (bare origin) and peer/ (another clone for pull)."""
+    site = os.path.join(workdir, "site")
+    remote = os.path.join(workdir, "remote.git")
+    peer = os.path.join(workdir, "peer")
+    portfolio = os.path.join(site, "assets", "img", "portfolio")
+    for num in range(1, folders + 1):
+        folder = os.path.join(portfolio, f"w{num}")
+        os.makedirs(folder)
+        for index in range(1, images + 1):
+            with open(os.path.join(folder, f"{index}.webp"), 'wb') as f:
+                f.write(webp)
+    with open(os.path.join(site, "portfolio_description.json"), 'w', encoding='utf-8') as f:
+        json.dump([description(num) for num in range(1, folders + 1)], f, ensure_ascii=False, indent=4)
+    subprocess.run(['git', 'init', '-q', '--bare', '-b', 'main', remote], check=True, capture_output=True)
+    git(site, 'init', '-q', '-b', 'main')
+    git(site, 'add', '-A')
+    git(site, 'commit', '-q', '-m', 'Initial portfolio')
+    git(site, 'remote', 'add', 'origin', remote)
+    git(site, 'push', '-q', '-u', 'origin', 'main')
+    subprocess.run(['git', 'clone', '-q', remote, peer], check=True, capture_output=True)
+    return site, peer
+
+
+def point_at(site):
+    """Aim the class-level paths and caches at a freshly built site."""
+    from description_store import DescriptionStore
+    from git_operations import GitOperations
+    from portfolio_manager import PortfolioManager
+    PortfolioManager.BASE_DIR = site
+    PortfolioManager.DESCRIPTION_FILE = os.path.join(site, "portfolio_description.json")
+    PortfolioManager.DESCRIPTIONS = DescriptionStore(PortfolioManager.DESCRIPTION_FILE)
+    PortfolioManager.HASH_MANIFEST = os.path.join(os.path.dirname(site), "content_hashes.json")
+    PortfolioManager._hashes = None
+    PortfolioManager._hashes_dirty = False
+    PortfolioManager.invalidate_index()
+    PortfolioManager.pop_changed_paths()
+    GitOperations.REPO_PATH = site
+
+
+def bench_size(folders, args, webp, jpegs):
+    from description_store import DescriptionStore
+    from git_operations import GitOperations
+    from portfolio_manager import PortfolioManager
+
+    workdir = tempfile.mkdtemp(prefix=f"bench-{folders}-", dir=args.workdir)
+    results = {}
+    try:
+        start = time.perf_counter()
+        site, peer = build_site(workdir, folders, webp, args.folder_images)
+        results['build_site_s'] = round(time.perf_counter() - start, 3)
+        point_at(site)
+        repeat = args.repeat
+
+        def fresh_store():
+            PortfolioManager.DESCRIPTIONS = DescriptionStore(PortfolioManager.DESCRIPTION_FILE)
+        results['load_descriptions_cold'] = measure(PortfolioManager.load_descriptions, repeat, setup=fresh_store)
+        results['load_descriptions_warm'] = measure(PortfolioManager.load_descriptions, repeat, warmup=1)
+
+        results['get_portfolio_items_rebuild'] = measure(PortfolioManager.get_portfolio_items, repeat, setup=PortfolioManager.invalidate_index)
+        results['get_portfolio_items_warm'] = measure(PortfolioManager.get_portfolio_items, repeat, warmup=1)
+        for view in ('full', 'summary'):
+            serialize = lambda: json.dumps(PortfolioManager.query_portfolio_items(view=view)['items'], ensure_ascii=False).encode('utf-8')
+            body = serialize()
+            results[f'listing_json_{view}'] = dict(measure(serialize, repeat, warmup=1), bytes=len(body),
+                                                   gzip_bytes=len(gzip.compress(body, compresslevel=6)))
+        results['search_name'] = measure(lambda: PortfolioManager.query_portfolio_items(q="測試作品 12", limit=24, facets=True), repeat, warmup=1)
+        results['search_description_area'] = measure(
+            lambda: PortfolioManager.query_portfolio_items(q="作品描述", area="台北", limit=24, facets=True), repeat, warmup=1)
+
+        counter = {'next': folders + 1}
+        def add_entry():
+            num = counter['next']
+            counter['next'] += 1
+            return PortfolioManager.add_description_entry(f"w{num}", {'project_name': f"新作品 {num}", 'type': "住宅"})
+        results['add_description_entry'] = measure(add_entry, repeat)
+
+        def update_entry():
+            return PortfolioManager.update_description_entry("w1", {'project_name': f"更新 {time.time()}"})
+        results['update_description_entry'] = measure(update_entry, repeat)
+
+        def make_victim():
+            num = counter['next']
+            counter['next'] += 1
+            os.makedirs(os.path.join(PortfolioManager._portfolio_root(), f"w{num}"))
+            with open(os.path.join(PortfolioManager._portfolio_root(), f"w{num}", "1.webp"), 'wb') as f:
+                f.write(webp)
+            PortfolioManager.add_description_entry(f"w{num}", {'project_name': f"待刪除 {num}"})
+            counter['victim'] = f"w{num}"
+        results['delete_portfolio'] = measure(lambda: PortfolioManager.delete_portfolio(counter['victim']), repeat, setup=make_victim)
+
+        uploads = [Upload(name, data) for name, data in jpegs]
+        forget_sources = lambda: PortfolioManager._save_source_manifest("w1", {}) # force a full re-encode
+        results['replace_portfolio_images'] = dict(
+            measure(lambda: PortfolioManager.replace_portfolio_images("w1", uploads), args.image_repeat, setup=forget_sources, warmup=1),
+            images=len(uploads), source_size=f"{args.image_width}x{args.image_height}", workers=PortfolioManager.IMAGE_WORKERS)
+        results['replace_portfolio_images_unchanged'] = measure(lambda: PortfolioManager.replace_portfolio_images("w1", uploads), repeat)
+
+        # Git: commit what the benchmarks above changed, then time one description change per run.
+        git(site, 'add', '-A')
+        git(site, 'commit', '-q', '-m', 'Benchmark setup')
+        git(site, 'push', '-q')
+        PortfolioManager.pop_changed_paths()
+
+        def change_description():
+            PortfolioManager.update_description_entry("w1", {'description': f"git {time.time()}"})
+            counter['paths'] = PortfolioManager.pop_changed_paths()
+        results['git_add_commit_push'] = dict(
+            measure(lambda: GitOperations.add_commit_push("Benchmark change", counter['paths']), repeat, setup=change_description),
+            subprocesses=GitOperations.operation_stats().get('add_commit_push', {}).get('last', {}).get('subprocesses'))
+
+        def peer_push():
+            with open(os.path.join(peer, "peer.txt"), 'w', encoding='utf-8') as f:
+                f.write(str(time.time()))
+            git(peer, 'pull', '-q')
+            git(peer, 'add', 'peer.txt')
+            git(peer, 'commit', '-q', '-m', 'Peer change')
+            git(peer, 'push', '-q')
+        results['git_pull'] = measure(GitOperations.pull, repeat, setup=peer_push)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,1000,10000", help="comma separated folder counts")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--image-repeat", type=int, default=2, help="timed runs of replace_portfolio_images")
+    parser.add_argument("--images", type=int, default=6, help="images per replace (0.jpg is the floor plan)")
+    parser.add_argument("--folder-images", type=int, default=1, help="WebP files in each synthetic folder")
+    parser.add_argument("--image-width", type=int, default=4000)
+    parser.add_argument("--image-height", type=int, default=3000)
+    parser.add_argument("--workdir", default=None, help="where synthetic repos are built (default: system temp)")
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic repos")
+    parser.add_argument("--output", default=None, help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    # Configure the modules before importing them; they read the environment at import time.
+    scratch = tempfile.mkdtemp(prefix="bench-scratch-", dir=args.workdir)
+    os.environ.setdefault("GITHUB_REPO_NAME", "bench-site")
+    os.environ.setdefault("GITHUB_TOKEN", "bench")
+    os.environ["DERIVATIVE_CACHE_DIR"] = os.path.join(scratch, "derivatives")
+    os.environ["STATE_DIR"] = os.path.join(scratch, "state")
+    import PIL
+    from portfolio_manager import PortfolioManager
+
+    webp = tiny_webp()
+    jpegs = sample_jpegs(args.images, args.image_width, args.image_height)
+    git_version = subprocess.run(['git', '--version'], capture_output=True, text=True).stdout.strip()
+    report = {
+        'meta': {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'pillow': PIL.__version__, 'git': git_version, 'cpu_count': os.cpu_count(),
+            'args': vars(args),
+        },
+        'results': {},
+    }
+    try:
+        for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+            log(f"Benchmarking {size} folders...")
+            report['results'][str(size)] = bench_size(size, args, webp, jpegs)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+        if PortfolioManager._image_pool is not None:
+            PortfolioManager._image_pool.shutdown()
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+        log(f"Wrote {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
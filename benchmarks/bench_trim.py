@@ -0,0 +1,88 @@
+"""Correctness check and timing for PortfolioManager._trim_whitespace.
+
+Compares the current trim with the original difference-from-white implementation
+on synthetic floor plans (thin lines, JPEG noise, off-white margins) and prints
+the timings of both. tests/test_trim.py covers the edge cases (isolated pixels,
+1px lines).
+
+    python benchmarks/bench_trim.py [--repeat 5]
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GITHUB_REPO_NAME", "bench-portfolio")
+
+from PIL import Image, ImageChops, ImageDraw, ImageOps
+from portfolio_manager import PortfolioManager
+
+
+def legacy_trim(img, border=10):
+    """The original implementation, kept here as the reference result."""
+    img_rgb = img.convert("RGB")
+    bg = Image.new("RGB", img_rgb.size, (255, 255, 255))
+    diff = ImageChops.difference(img_rgb, bg)
+    diff = ImageChops.add(diff, diff, 2.0, -100)
+    bbox = diff.getbbox()
+    if bbox:
+        return ImageOps.expand(img_rgb.crop(bbox), border=border, fill="white")
+    return img_rgb
+
+
+def floor_plan(width, height, seed, jpeg=False):
+    rng = random.Random(seed)
+    img = Image.new("RGB", (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    x0, y0 = rng.randint(50, width // 4), rng.randint(50, height // 4)
+    x1, y1 = rng.randint(width * 3 // 4, width - 50), rng.randint(height * 3 // 4, height - 50)
+    draw.rectangle([x0, y0, x1, y1], outline=(20, 20, 20), width=rng.randint(1, 6))
+    for _ in range(40):
+        if rng.random() < 0.5:
+            y = rng.randint(y0, y1)
+            draw.line([rng.randint(x0, x1), y, rng.randint(x0, x1), y], fill=(40, 40, 40), width=rng.randint(1, 3))
+        else:
+            x = rng.randint(x0, x1)
+            draw.line([x, rng.randint(y0, y1), x, rng.randint(y0, y1)], fill=(40, 40, 40), width=rng.randint(1, 3))
+    # A thin dimension line outside the walls and a light-grey (non-content) smudge.
+    draw.line([x0, y1 + 30, x1, y1 + 30], fill=(120, 120, 120), width=1)
+    draw.rectangle([5, 5, 40, 40], fill=(200, 200, 200))
+    if jpeg:
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=80)
+        img = Image.open(io.BytesIO(buf.getvalue())).convert("RGB")
+    return img
+
+
+def timed(fn, img, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(img)
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cases = [(800, 600, False), (3000, 2000, False), (3000, 2000, True), (6000, 4000, False), (8000, 6000, True)]
+    failures = 0
+    for idx, (width, height, jpeg) in enumerate(cases):
+        img = floor_plan(width, height, seed=idx, jpeg=jpeg)
+        expected, legacy_s = timed(legacy_trim, img, args.repeat)
+        actual, fast_s = timed(PortfolioManager._trim_whitespace, img, args.repeat)
+        same = expected.size == actual.size and ImageChops.difference(expected, actual).getbbox() is None
+        failures += not same
+        print(f"{width}x{height}{' jpeg' if jpeg else ''}: legacy {legacy_s * 1000:.1f} ms, "
+              f"current {fast_s * 1000:.1f} ms ({legacy_s / fast_s:.1f}x) -> {actual.size} {'OK' if same else 'MISMATCH'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
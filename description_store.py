@@ -0,0 +1,162 @@
+import os
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+class DescriptionStore:
+    """In-memory view of portfolio_description.json keyed by folder (wN).
+
+    Reads are served from memory and only re-parse the file when its mtime/size
+    change (e.g. after a git pull or a write by another worker). Writes are
+    serialized with `lock` (pass a FileLock to also exclude other processes),
+    re-read the file under it and go through a temp file + rename, so a crash
+    never leaves a half-written file and no worker overwrites another's change.
+    The on-disk format (list order, ensure_ascii=False, indent=4) is unchanged."""
+
+    def __init__(self, path: str, lock=None):
+        self.path = path
+        self.lock = lock if lock is not None else threading.RLock()
+        self._mutex = threading.RLock() # guards the in-memory view; taken after `lock`
+        self._entries: List[Dict] = []
+        self._by_folder: Dict[str, Dict] = {}
+        self._signature = None
+        self.load_error = None # None, "missing", "invalid_json" or "not_list"
+
+    @staticmethod
+    def folder_key(entry: Dict) -> str:
+        return entry.get("圖片連結", "").strip('/').split('/')[-1]
+
+    def _file_signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size, st.st_ino) # inode: every write is a new file
+        except OSError:
+            return None
+
+    def _reindex(self):
+        self._by_folder = {}
+        for entry in self._entries:
+            folder = self.folder_key(entry)
+            if folder:
+                self._by_folder[folder] = entry
+
+    def _reload_if_changed(self):
+        signature = self._file_signature()
+        if signature is not None and signature == self._signature:
+            return
+        entries, self.load_error = [], None
+        if signature is None:
+            self.load_error = "missing"
+        else:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+                if not isinstance(entries, list):
+                    self.load_error = "not_list"
+                    entries = []
+            except json.JSONDecodeError as e:
+                print(f"作品描述json檔案錯誤: {self.path}: {e}")
+                self.load_error = "invalid_json"
+        self._entries = entries
+        self._reindex()
+        self._signature = signature
+
+    def _write(self, entries: List[Dict]):
+        """Save `entries` and make them the in-memory view. Writers build `entries` from
+        copies, so if saving fails (e.g. ENOSPC) memory still matches the file on disk."""
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._entries = entries
+        self._reindex()
+        self.load_error = None
+        self._signature = self._file_signature()
+
+    # --- Reads ---
+    def status(self) -> Optional[str]:
+        """Reload if needed and return the load error, if any. Hold `lock` across
+        status() and a following write to act on a consistent view."""
+        with self._mutex:
+            self._reload_if_changed()
+            return self.load_error
+
+    def by_folder(self) -> Dict[str, Dict]:
+        """folder -> entry for every wN folder (the shape load_descriptions returns)."""
+        with self._mutex:
+            self._reload_if_changed()
+            return {k: v for k, v in self._by_folder.items() if k.startswith('w')}
+
+    def get(self, folder_name: str) -> Optional[Dict]:
+        with self._mutex:
+            self._reload_if_changed()
+            return self._by_folder.get(folder_name)
+
+    def entries(self) -> List[Dict]:
+        with self._mutex:
+            self._reload_if_changed()
+            return list(self._entries)
+
+    # --- Writes ---
+    def put(self, folder_name: str, entry: Dict):
+        """Replace any entries for folder_name with `entry`, appended at the end."""
+        with self.lock, self._mutex:
+            self._reload_if_changed()
+            entries = [e for e in self._entries if self.folder_key(e) != folder_name]
+            entries.append(entry)
+            self._write(entries)
+
+    def update(self, folder_name: str, fields: Dict) -> bool:
+        """Update fields of the entry for folder_name. False if not found."""
+        with self.lock, self._mutex:
+            self._reload_if_changed()
+            entry = self._by_folder.get(folder_name)
+            if entry is None:
+                return False
+            updated = dict(entry, **fields)
+            self._write([updated if e is entry else e for e in self._entries])
+            return True
+
+    def apply(self, put: Optional[Dict[str, Dict]] = None, update: Optional[Dict[str, Dict]] = None,
+              delete: Optional[List[str]] = None) -> Dict[str, bool]:
+        """Several changes with one reload and one write: `put` entries are added (replacing
+        any for the same folder), `update` fields are merged into existing entries and `delete`
+        folders are removed. Returns folder -> whether its update/delete found an entry.
+        The file is only written if something changed, and never over an unreadable one."""
+        with self.lock, self._mutex:
+            self._reload_if_changed()
+            if self.load_error in ("invalid_json", "not_list"):
+                raise ValueError(f"{self.path} is not a valid description list ({self.load_error})")
+            found = {}
+            deleted = {folder for folder in (delete or []) if folder in self._by_folder}
+            for folder in delete or []:
+                found[folder] = folder in deleted
+            updated = {}  # id of the current entry -> its updated copy
+            for folder, fields in (update or {}).items():
+                entry = self._by_folder.get(folder)
+                found[folder] = entry is not None and folder not in deleted
+                if found[folder]:
+                    updated[id(entry)] = dict(entry, **fields)
+            if not put and not any(found.values()):
+                return found
+            replaced = deleted | set(put or {})
+            entries = [updated.get(id(e), e) for e in self._entries if self.folder_key(e) not in replaced]
+            entries.extend((put or {}).values())
+            self._write(entries)
+            return found
+
+    def delete(self, folder_name: str) -> bool:
+        """Remove every entry for folder_name. False if there was none."""
+        with self.lock, self._mutex:
+            self._reload_if_changed()
+            if folder_name not in self._by_folder:
+                return False
+            self._write([e for e in self._entries if self.folder_key(e) != folder_name])
+            return True
@@ -0,0 +1,65 @@
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError: # Windows: threads in this process are still serialized
+    fcntl = None
+
+class FileLock:
+    """Re-entrant lock that also excludes other worker processes via flock() on `path`.
+
+    Threads in one process serialize on an RLock; the outermost acquire takes the
+    file lock and the matching release drops it, so nested `with` blocks are safe."""
+    # Lock and stamp files shared by all workers. Kept outside the website repo.
+    STATE_DIR = os.path.abspath(os.getenv('STATE_DIR', os.path.join("resources", ".state")))
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    @staticmethod
+    def named(name: str) -> "FileLock":
+        return FileLock(os.path.join(FileLock.STATE_DIR, f"{name}.lock"))
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """With blocking=False, return False instead of waiting if another thread or process holds the lock."""
+        if not self._lock.acquire(blocking):
+            return False
+        if self._depth == 0 and fcntl is not None:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    self._lock.release()
+                    return False
+                except BaseException:
+                    os.close(fd)
+                    raise
+            except BaseException:
+                self._lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fd, self._fd = self._fd, None
+            try:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+        self._lock.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
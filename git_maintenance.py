@@ -0,0 +1,190 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from file_lock import FileLock
+from git_operations import GitOperations
+from git_push_queue import GitPushQueue
+from metrics import Metrics
+
+load_dotenv()
+
+class GitMaintenance:
+    """Repacks, writes the commit-graph and prunes the local clone in a background thread,
+    so pull/add/status stay fast as image commits pile up. Runs every
+    GIT_MAINTENANCE_INTERVAL seconds (0 disables), and only once no push has been queued
+    or run for GIT_MAINTENANCE_IDLE seconds.
+
+    Each step holds REPO_LOCK on its own and only if it is free: when a push is waiting
+    or running the run stops and is retried later, so maintenance never delays a save.
+    With several worker processes only one runs maintenance per interval (STATE_FILE)."""
+    INTERVAL = int(os.getenv('GIT_MAINTENANCE_INTERVAL', '86400'))
+    IDLE = float(os.getenv('GIT_MAINTENANCE_IDLE', '300'))
+    RETRY = 60
+    PRUNE_EXPIRE = os.getenv('GIT_MAINTENANCE_PRUNE_EXPIRE', '2.weeks.ago')
+    STATE_FILE = os.path.join(FileLock.STATE_DIR, "git_maintenance.json")
+    RUN_LOCK = FileLock.named("maintenance")
+
+    _thread = None
+    _start_lock = threading.Lock()
+    _wakeup = threading.Event()
+    _requested = False
+    _state = {
+        'last_run': None,  # unix time of the last finished run (any worker)
+        'success': None,
+        'message': '',
+        'before': {},      # git count-objects -v
+        'after': {},
+        'steps': {},       # step -> seconds
+        'running': False,
+    }
+
+    @staticmethod
+    def start():
+        if GitMaintenance.INTERVAL <= 0:
+            return
+        with GitMaintenance._start_lock:
+            if GitMaintenance._thread and GitMaintenance._thread.is_alive():
+                return
+            GitMaintenance._thread = threading.Thread(target=GitMaintenance._run, name="git-maintenance", daemon=True)
+            GitMaintenance._thread.start()
+
+    @staticmethod
+    def request_run():
+        """Run as soon as pushes are idle, regardless of the interval."""
+        GitMaintenance._requested = True
+        GitMaintenance.start()
+        GitMaintenance._wakeup.set()
+
+    @staticmethod
+    def status() -> Dict:
+        status = dict(GitMaintenance._state)
+        shared = GitMaintenance._load_shared()
+        if shared and (shared.get('last_run') or 0) > (status['last_run'] or 0):
+            status.update(shared)
+        status['interval'] = GitMaintenance.INTERVAL
+        status['requested'] = GitMaintenance._requested
+        return status
+
+    @staticmethod
+    def _run():
+        while True:
+            GitMaintenance._wakeup.clear()
+            last_run = (GitMaintenance._load_shared() or {}).get('last_run') or 0
+            wait = 0 if GitMaintenance._requested else last_run + GitMaintenance.INTERVAL - time.time()
+            if wait <= 0:
+                idle = GitPushQueue.idle_seconds()
+                if not idle or idle < GitMaintenance.IDLE:
+                    wait = max(GitMaintenance.IDLE - idle, 1.0)
+                else:
+                    try:
+                        done = GitMaintenance.run_once()
+                    except Exception as e:
+                        print(f"Background maintenance error: {e}")
+                        done = True
+                    if done:
+                        GitMaintenance._requested = False
+                    wait = GitMaintenance.INTERVAL if done else GitMaintenance.RETRY
+            GitMaintenance._wakeup.wait(wait)
+
+    @staticmethod
+    def _load_shared() -> Optional[Dict]:
+        try:
+            with open(GitMaintenance.STATE_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _save_shared():
+        try:
+            os.makedirs(os.path.dirname(GitMaintenance.STATE_FILE), exist_ok=True)
+            tmp_path = f"{GitMaintenance.STATE_FILE}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({k: v for k, v in GitMaintenance._state.items() if k != 'running'}, f)
+            os.replace(tmp_path, GitMaintenance.STATE_FILE)
+        except OSError as e:
+            print(f"Could not write maintenance state {GitMaintenance.STATE_FILE}: {e}")
+
+    @staticmethod
+    def _steps() -> List[Tuple[str, List[str]]]:
+        # Packs loose objects and merges small packs geometrically, without rewriting the big ones.
+        # Geometric repacking does not handle the promisor packs of a partial clone; there the
+        # loose objects are only packed incrementally.
+        pack_dir = os.path.join(GitOperations.REPO_PATH, '.git', 'objects', 'pack')
+        partial = os.path.isdir(pack_dir) and any(name.endswith('.promisor') for name in os.listdir(pack_dir))
+        return [
+            ('repack', ['repack', '-d', '-l'] + ([] if partial else ['--geometric=2'])),
+            ('commit-graph', ['commit-graph', 'write', '--reachable', '--changed-paths']),
+            ('prune', ['prune', f'--expire={GitMaintenance.PRUNE_EXPIRE}']),
+        ]
+
+    @staticmethod
+    def count_objects() -> Dict[str, int]:
+        """`git count-objects -v` as a dict (count, size, in-pack, packs, size-pack... sizes in KiB)."""
+        success, output = GitOperations._run_git_command(['count-objects', '-v'])
+        counts = {}
+        if success:
+            for line in output.splitlines():
+                key, _, value = line.partition(':')
+                if value.strip().isdigit():
+                    counts[key.strip()] = int(value)
+        return counts
+
+    @staticmethod
+    def run_once() -> bool:
+        """Run every step unless a push needs the repo. Returns False if the run was
+        deferred and should be retried, True once it finished (or failed)."""
+        if not os.path.exists(GitOperations.REPO_PATH):
+            return False
+        if not GitMaintenance.RUN_LOCK.acquire(blocking=False):
+            return True # another worker is running maintenance
+        state = GitMaintenance._state
+        state['running'] = True
+        try:
+            shared = GitMaintenance._load_shared() or {}
+            if not GitMaintenance._requested and (shared.get('last_run') or 0) + GitMaintenance.INTERVAL > time.time():
+                return True
+            before = GitMaintenance.count_objects()
+            steps = {}
+            for name, args in GitMaintenance._steps():
+                if not GitPushQueue.idle_seconds() or not GitOperations.REPO_LOCK.acquire(blocking=False):
+                    print(f"Repository maintenance deferred before '{name}': a push needs the repository")
+                    Metrics.inc('portfolio_git_maintenance_runs_total', {'outcome': 'deferred'})
+                    return False
+                try:
+                    start = time.perf_counter()
+                    success, message = GitOperations._run_git_command(args)
+                    steps[name] = round(time.perf_counter() - start, 3)
+                finally:
+                    GitOperations.REPO_LOCK.release()
+                if not success:
+                    GitMaintenance._finish(False, f"{name} failed: {message}", before, GitMaintenance.count_objects(), steps)
+                    return True
+            after = GitMaintenance.count_objects()
+            GitMaintenance._finish(True, "Repository maintenance finished", before, after, steps)
+            return True
+        finally:
+            state['running'] = False
+            GitMaintenance.RUN_LOCK.release()
+
+    @staticmethod
+    def _finish(success: bool, message: str, before: Dict[str, int], after: Dict[str, int], steps: Dict[str, float]):
+        GitMaintenance._state.update({
+            'last_run': time.time(), 'success': success, 'message': message.strip(),
+            'before': before, 'after': after, 'steps': steps,
+        })
+        Metrics.inc('portfolio_git_maintenance_runs_total', {'outcome': 'success' if success else 'failure'})
+        for kind, key in (('loose', 'count'), ('packed', 'in-pack'), ('packs', 'packs')):
+            if key in after:
+                Metrics.set('portfolio_repo_objects', after[key], {'kind': kind})
+        def describe(key):
+            return f"{before.get(key, '?')} -> {after.get(key, '?')}"
+        size_mb = lambda counts: (counts.get('size', 0) + counts.get('size-pack', 0)) / 1024
+        print(f"{message.strip()}: loose objects {describe('count')}, packed {describe('in-pack')}, "
+              f"packs {describe('packs')}, size {size_mb(before):.1f} MB -> {size_mb(after):.1f} MB; "
+              + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in steps.items()))
+        GitMaintenance._save_shared()
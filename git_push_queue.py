@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+from dotenv import load_dotenv
+
+from git_operations import GitOperations
+from metrics import Metrics
+
+load_dotenv()
+
+class GitPushQueue:
+    """Single git writer for portfolio mutations. Commit messages are queued and a
+    dedicated worker waits for a quiet period (GIT_PUSH_DEBOUNCE seconds, at most
+    GIT_PUSH_MAX_DELAY) so a burst of saves becomes one commit and one push.
+    Each entry keeps its individual change messages, never a rendered summary, so a
+    combined commit lists every change once at the same level.
+    Changed paths are handed over when a change is queued; if a push fails, the next one
+    stages the whole tree so the failed batch's files are not left uncommitted."""
+    DEBOUNCE = float(os.getenv('GIT_PUSH_DEBOUNCE', '2'))
+    MAX_DELAY = float(os.getenv('GIT_PUSH_MAX_DELAY', '30'))
+    LOCK_RETRIES = 5
+    LOCK_ERRORS = ("index.lock", "Unable to create", "cannot lock ref")
+
+    _cond = threading.Condition()
+    _pending: List[Tuple[List[str], Optional[List[str]]]] = []
+    _first_enqueued = None
+    _last_enqueued = None
+    _thread = None
+    _running = False
+    _last_result: Dict = {}
+    _stage_all = False # set after a failed push, cleared by the next successful one
+
+    @staticmethod
+    def enqueue(commit_message: Union[str, List[str]], paths: Optional[List[str]] = None) -> int:
+        """Queue a commit message (or the messages of several changes made together) and the
+        repo-relative paths they changed (None means stage the whole tree). Returns the
+        resulting queue depth."""
+        messages = [commit_message] if isinstance(commit_message, str) else list(commit_message)
+        with GitPushQueue._cond:
+            now = time.time()
+            if not GitPushQueue._pending:
+                GitPushQueue._first_enqueued = now
+            GitPushQueue._last_enqueued = now
+            GitPushQueue._pending.append((messages, paths))
+            if GitPushQueue._thread is None or not GitPushQueue._thread.is_alive():
+                GitPushQueue._thread = threading.Thread(target=GitPushQueue._run, name="git-push", daemon=True)
+                GitPushQueue._thread.start()
+            GitPushQueue._cond.notify()
+            Metrics.set('portfolio_git_push_queue_depth', len(GitPushQueue._pending))
+            return len(GitPushQueue._pending)
+
+    @staticmethod
+    def status() -> Dict:
+        with GitPushQueue._cond:
+            return {
+                'depth': len(GitPushQueue._pending),
+                'pending': [message for messages, _ in GitPushQueue._pending for message in messages],
+                'running': GitPushQueue._running,
+                'stage_all': GitPushQueue._stage_all,
+                'last_result': dict(GitPushQueue._last_result),
+                'git_operations': GitOperations.operation_stats(),
+            }
+
+    @staticmethod
+    def idle_seconds() -> float:
+        """Seconds since this process last queued or finished a push; 0 while one is pending or running."""
+        with GitPushQueue._cond:
+            if GitPushQueue._pending or GitPushQueue._running:
+                return 0.0
+            last = max(GitPushQueue._last_enqueued or 0, GitPushQueue._last_result.get('time') or 0)
+            return time.time() - last if last else float('inf')
+
+    @staticmethod
+    def _take_batch() -> List[Tuple[List[str], Optional[List[str]]]]:
+        """Block until there is work and the burst has gone quiet, then take it all."""
+        with GitPushQueue._cond:
+            while True:
+                if not GitPushQueue._pending:
+                    GitPushQueue._cond.wait()
+                    continue
+                now = time.time()
+                quiet_at = GitPushQueue._last_enqueued + GitPushQueue.DEBOUNCE
+                deadline = GitPushQueue._first_enqueued + GitPushQueue.MAX_DELAY
+                if now >= quiet_at or now >= deadline:
+                    batch = GitPushQueue._pending
+                    GitPushQueue._pending = []
+                    GitPushQueue._running = True
+                    Metrics.set('portfolio_git_push_queue_depth', 0)
+                    return batch
+                GitPushQueue._cond.wait(min(quiet_at, deadline) - now)
+
+    @staticmethod
+    def combine_messages(messages: List[str]) -> str:
+        """One commit message for a flat list of change messages."""
+        if len(messages) == 1:
+            return messages[0]
+        return f"Update {len(messages)} portfolio changes\n\n" + "\n".join(f"- {m}" for m in messages)
+
+    @staticmethod
+    def _run():
+        while True:
+            batch = GitPushQueue._take_batch()
+            try:
+                GitPushQueue._push_batch(batch)
+            except Exception as e:
+                print(f"Background push error: {e}")
+                GitPushQueue._record(GitPushQueue.batch_messages(batch), False, str(e), 0)
+            finally:
+                with GitPushQueue._cond:
+                    GitPushQueue._running = False
+
+    @staticmethod
+    def batch_messages(batch: List[Tuple[List[str], Optional[List[str]]]]) -> List[str]:
+        return [message for messages, _ in batch for message in messages]
+
+    @staticmethod
+    def combine_paths(batch: List[Tuple[List[str], Optional[List[str]]]]) -> Optional[List[str]]:
+        if any(paths is None for _, paths in batch):
+            return None
+        return sorted({path for _, paths in batch for path in paths})
+
+    @staticmethod
+    def _push_batch(batch: List[Tuple[List[str], Optional[List[str]]]]):
+        paths = GitPushQueue.combine_paths(batch)
+        batch = GitPushQueue.batch_messages(batch)
+        with GitPushQueue._cond:
+            if GitPushQueue._stage_all:
+                paths = None
+        commit_message = GitPushQueue.combine_messages(batch)
+        if paths == []:
+            # Another batch already picked up these files (paths are popped when enqueued).
+            GitPushQueue._record(batch, True, "No changes detected to commit or push.", 0)
+            return
+        print(f"Background task started: Pushing {len(batch)} change(s)")
+        if not os.path.exists(GitOperations.REPO_PATH):
+            print("Repository not found locally, skipping push.")
+            GitPushQueue._record(batch, False, "Repository not found locally", 0)
+            return
+
+        success, message = False, ""
+        for attempt in range(1, GitPushQueue.LOCK_RETRIES + 1):
+            with GitOperations.REPO_LOCK:
+                pull_success, pull_msg = GitOperations.pull()
+                if not pull_success:
+                    print(f"Pull before push failed: {pull_msg}. Attempting push anyway...")
+                success, message = GitOperations.add_commit_push(commit_message, paths)
+            if success or not any(marker in message for marker in GitPushQueue.LOCK_ERRORS):
+                break
+            # Another git process (e.g. a manual /api/git call or an editor) holds a lock; back off.
+            print(f"Git lock contention, retrying ({attempt}/{GitPushQueue.LOCK_RETRIES}): {message}")
+            time.sleep(min(2 ** attempt, 30))
+
+        if success:
+            print(f"Background task finished: Successfully pushed {len(batch)} change(s). Message: {message}")
+        else:
+            print(f"Background task finished: Failed to push {len(batch)} change(s). Error: {message}")
+        GitPushQueue._record(batch, success, message, attempt)
+
+    @staticmethod
+    def _record(batch: List[str], success: bool, message: str, attempts: int):
+        outcome = 'failure' if not success else ('skipped' if attempts == 0 else 'success')
+        Metrics.inc('portfolio_git_push_batches_total', {'outcome': outcome})
+        Metrics.inc('portfolio_git_push_changes_total', {'outcome': outcome}, len(batch))
+        with GitPushQueue._cond:
+            GitPushQueue._stage_all = not success
+            GitPushQueue._last_result = {
+                'time': time.time(), 'success': success, 'message': message,
+                'commit_messages': batch, 'attempts': attempts,
+            }
@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+from file_lock import FileLock
+from git_operations import GitOperations
+
+load_dotenv()
+
+class GitSync:
+    """Keeps the local clone up to date in a background thread so page loads
+    never wait on the network. Fetches every GIT_SYNC_INTERVAL seconds or
+    when request_sync() is called, and fast-forwards when behind.
+
+    With several worker processes each runs this loop; the result of every sync is
+    shared through STATE_FILE, so a worker skips a sync another one just finished."""
+    INTERVAL = int(os.getenv('GIT_SYNC_INTERVAL', '300'))
+    STATE_FILE = os.path.join(FileLock.STATE_DIR, "git_sync.json")
+    SHARED_KEYS = ('last_sync', 'last_success', 'success', 'message', 'ahead', 'behind')
+
+    _thread = None
+    _start_lock = threading.Lock()
+    _wakeup = threading.Event()
+    _state = {
+        'last_sync': None,     # unix time of the last finished sync attempt
+        'last_success': None,  # unix time of the last successful sync
+        'success': None,
+        'message': '',
+        'ahead': 0,
+        'behind': 0,
+        'syncing': False,
+    }
+
+    @staticmethod
+    def start():
+        with GitSync._start_lock:
+            if GitSync._thread and GitSync._thread.is_alive():
+                return
+            GitSync._thread = threading.Thread(target=GitSync._run, name="git-sync", daemon=True)
+            GitSync._thread.start()
+
+    @staticmethod
+    def request_sync():
+        """Ask for a sync as soon as possible (starts the service if needed)."""
+        GitSync.start()
+        GitSync._wakeup.set()
+
+    @staticmethod
+    def status() -> Dict:
+        status = dict(GitSync._state)
+        shared = GitSync._load_shared()
+        if shared and (shared.get('last_sync') or 0) > (status['last_sync'] or 0):
+            status.update(shared)
+        status['stale'] = status['behind'] > 0
+        status['interval'] = GitSync.INTERVAL
+        return status
+
+    @staticmethod
+    def _run():
+        requested = False
+        while True:
+            GitSync._wakeup.clear()
+            # An explicit request wants a sync that finished after it was made; a periodic
+            # one is satisfied by any worker's sync within the last half interval.
+            now = time.time()
+            fresh_after = now if requested else now - GitSync.INTERVAL / 2
+            try:
+                GitSync.sync_once(fresh_after)
+            except Exception as e:
+                print(f"Background sync error: {e}")
+            requested = GitSync._wakeup.wait(GitSync.INTERVAL)
+
+    @staticmethod
+    def _load_shared() -> Optional[Dict]:
+        try:
+            with open(GitSync.STATE_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _save_shared():
+        try:
+            os.makedirs(os.path.dirname(GitSync.STATE_FILE), exist_ok=True)
+            tmp_path = f"{GitSync.STATE_FILE}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({k: GitSync._state[k] for k in GitSync.SHARED_KEYS}, f)
+            os.replace(tmp_path, GitSync.STATE_FILE)
+        except OSError as e:
+            print(f"Could not write sync state {GitSync.STATE_FILE}: {e}")
+
+    @staticmethod
+    def sync_once(fresh_after: Optional[float] = None):
+        """Fetch and fast-forward. If fresh_after is given and any worker finished a
+        sync since then, adopt its result instead of fetching again."""
+        state = GitSync._state
+        state['syncing'] = True
+        try:
+            with GitOperations.REPO_LOCK:
+                shared = GitSync._load_shared() if fresh_after is not None else None
+                if shared and (shared.get('last_sync') or 0) >= fresh_after and os.path.exists(GitOperations.REPO_PATH):
+                    state.update(shared)
+                    return
+                if not os.path.exists(GitOperations.REPO_PATH):
+                    print("Repository not found locally, attempting to clone...")
+                    success, message = GitOperations.clone()
+                    GitSync._finish(success, message, 0, 0)
+                    return
+
+                success, message = GitOperations.fetch()
+                if not success:
+                    GitSync._finish(False, f"Fetch failed: {message}", state['ahead'], state['behind'])
+                    return
+                ok, (ahead, behind) = GitOperations.ahead_behind()
+                state['ahead'], state['behind'] = ahead, behind
+                if ok and behind > 0:
+                    print(f"Local clone is {behind} commit(s) behind, pulling...")
+                    success, message = GitOperations.pull()
+                    ok, (ahead, behind) = GitOperations.ahead_behind()
+                GitSync._finish(success, message, ahead, behind)
+        finally:
+            state['syncing'] = False
+
+    @staticmethod
+    def _finish(success: bool, message: str, ahead: int, behind: int):
+        now = time.time()
+        GitSync._state.update({
+            'last_sync': now, 'success': success, 'message': message.strip(),
+            'ahead': ahead, 'behind': behind,
+        })
+        if success:
+            GitSync._state['last_success'] = now
+        else:
+            print(f"Background sync failed: {message}")
+        GitSync._save_shared()
@@ -0,0 +1,21 @@
+# Production server: gunicorn -c gunicorn.conf.py app:app
+# Workers coordinate through lock/stamp files in STATE_DIR (see file_lock.py), so
+# git operations, description writes and folder numbering are safe across processes.
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('WEB_WORKERS', '2'))
+# Threads per worker; uploads are spooled and processed in the background.
+threads = int(os.environ.get('WEB_THREADS', '8'))
+worker_class = 'gthread'
+timeout = int(os.environ.get('WEB_TIMEOUT', '120'))
+accesslog = '-'
+
+# Each worker owns an image process pool; split the CPUs between workers by default.
+os.environ.setdefault('IMAGE_WORKERS', str(max(1, (os.cpu_count() or 1) // workers)))
+
+def post_worker_init(worker):
+    """Workers serve at once; the first to take the repo lock clones in the background,
+    then each builds its index (see startup.py and /readyz)."""
+    from startup import Startup
+    Startup.start()
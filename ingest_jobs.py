@@ -0,0 +1,154 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class SpooledUpload:
+    """Stand-in for a werkzeug FileStorage whose content was already written to disk."""
+    def __init__(self, filename: str, path: str):
+        self.filename = filename
+        self.path = path
+
+    def read(self) -> bytes:
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+
+class IngestJobs:
+    """Background image ingest. Uploads are spooled to disk in the request and
+    processed by a small worker pool; clients poll job status by id.
+
+    A task is called as task(files, progress) and returns (success, message, folder_name).
+    progress(index, ok, error) is called once per image as it finishes.
+
+    Job status is also written to SPOOL_DIR/<job_id>.json, so a poll answered by a
+    different worker process than the one running the job still finds it."""
+    SPOOL_DIR = os.path.abspath(os.getenv('INGEST_SPOOL_DIR', os.path.join("resources", ".spool")))
+    WORKERS = int(os.getenv('INGEST_WORKERS', '2'))
+    RETENTION_SECONDS = 3600
+
+    _executor = None
+    _lock = threading.Lock()
+    _jobs: Dict[str, Dict] = {}
+
+    @staticmethod
+    def spool(files: List) -> Tuple[str, List[SpooledUpload]]:
+        """Stream each uploaded FileStorage to the spool directory of a new job id."""
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(IngestJobs.SPOOL_DIR, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        spooled = []
+        for idx, file_storage in enumerate(files):
+            path = os.path.join(job_dir, f"{idx}.upload")
+            file_storage.save(path)
+            spooled.append(SpooledUpload(file_storage.filename, path))
+        return job_id, spooled
+
+    @staticmethod
+    def submit(job_id: str, kind: str, files: List[SpooledUpload],
+               task: Callable, on_success: Optional[Callable] = None) -> Dict:
+        job = {
+            'id': job_id, 'kind': kind, 'status': 'queued',
+            'created': time.time(), 'started': None, 'finished': None,
+            'total': len(files), 'done': 0,
+            'images': [{'name': f.filename, 'status': 'pending', 'error': ''} for f in files],
+            'errors': [], 'folder': None, 'message': '',
+        }
+        with IngestJobs._lock:
+            IngestJobs._prune()
+            IngestJobs._jobs[job_id] = job
+            IngestJobs._persist(job)
+            if IngestJobs._executor is None:
+                IngestJobs._executor = ThreadPoolExecutor(max_workers=IngestJobs.WORKERS, thread_name_prefix="ingest")
+            IngestJobs._executor.submit(IngestJobs._run, job, files, task, on_success)
+        return IngestJobs.get(job_id)
+
+    @staticmethod
+    def get(job_id: str) -> Optional[Dict]:
+        with IngestJobs._lock:
+            job = IngestJobs._jobs.get(job_id)
+            if job is not None:
+                return dict(job, images=[dict(i) for i in job['images']], errors=list(job['errors']))
+        if not all(c in '0123456789abcdef' for c in job_id):
+            return None
+        try:
+            with open(IngestJobs._status_path(job_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _status_path(job_id: str) -> str:
+        return os.path.join(IngestJobs.SPOOL_DIR, f"{job_id}.json")
+
+    @staticmethod
+    def _persist(job: Dict):
+        """Write the job's status for other workers. Caller holds _lock."""
+        path = IngestJobs._status_path(job['id'])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(IngestJobs.SPOOL_DIR, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(job, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write job status {path}: {e}")
+
+    @staticmethod
+    def _prune():
+        cutoff = time.time() - IngestJobs.RETENTION_SECONDS
+        for job_id in [j for j, job in IngestJobs._jobs.items() if job['finished'] and job['finished'] < cutoff]:
+            del IngestJobs._jobs[job_id]
+        try:
+            for name in os.listdir(IngestJobs.SPOOL_DIR):
+                path = os.path.join(IngestJobs.SPOOL_DIR, name)
+                if name.endswith('.json') and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _run(job: Dict, files: List[SpooledUpload], task: Callable, on_success: Optional[Callable]):
+        def progress(index: int, ok: bool, error: str = ''):
+            with IngestJobs._lock:
+                image = job['images'][index]
+                image['status'] = 'done' if ok else 'failed'
+                image['error'] = error
+                job['done'] += 1
+                if not ok:
+                    job['errors'].append(f"{image['name']}: {error}")
+                IngestJobs._persist(job)
+
+        with IngestJobs._lock:
+            job['status'] = 'running'
+            job['started'] = time.time()
+            IngestJobs._persist(job)
+        try:
+            success, message, folder_name = task(files, progress)
+        except Exception as e:
+            print(f"Ingest job {job['id']} crashed: {e}")
+            success, message, folder_name = False, f"處理圖片時出現錯誤: {e}", None
+        finally:
+            shutil.rmtree(os.path.join(IngestJobs.SPOOL_DIR, job['id']), ignore_errors=True)
+
+        if success and on_success:
+            try:
+                message += on_success(folder_name) or ''
+            except Exception as e:
+                print(f"Ingest job {job['id']} success hook failed: {e}")
+        with IngestJobs._lock:
+            job['status'] = 'succeeded' if success else 'failed'
+            job['message'] = message
+            job['folder'] = folder_name
+            job['finished'] = time.time()
+            if not success and message not in job['errors']:
+                job['errors'].append(message)
+            IngestJobs._persist(job)
+        print(f"Ingest job {job['id']} ({job['kind']}) {job['status']}: {message}")
@@ -0,0 +1,105 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+class Metrics:
+    """Process-local counters, gauges and histograms rendered in the Prometheus text
+    format at /metrics. An update is a dict lookup and a few additions under one lock,
+    so instrumentation stays on permanently."""
+    DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    # name -> (type, help). Every metric used in the app is declared here.
+    DEFINITIONS = {
+        'portfolio_http_request_duration_seconds': ('histogram', 'Request latency by route, method and status.'),
+        'portfolio_git_command_duration_seconds': ('histogram', 'Wall time of git subprocesses by subcommand.'),
+        'portfolio_git_commands_total': ('counter', 'Git subprocesses by subcommand and exit code.'),
+        'portfolio_image_stage_duration_seconds': ('histogram', 'Per-image processing time by stage (decode, trim, encode, derivatives).'),
+        'portfolio_image_bytes_total': ('counter', 'Image bytes read from uploads (in) and written as WebP (out) and AVIF (out_avif).'),
+        'portfolio_images_processed_total': ('counter', 'Uploaded images processed, by result.'),
+        'portfolio_git_push_batches_total': ('counter', 'Background push batches by outcome (success, failure, skipped).'),
+        'portfolio_git_push_changes_total': ('counter', 'Portfolio changes carried by background push batches, by outcome.'),
+        'portfolio_git_push_queue_depth': ('gauge', 'Changes waiting in the background push queue.'),
+        'portfolio_git_clone_seconds': ('gauge', 'Wall time of the last clone, including sparse checkout.'),
+        'portfolio_repo_disk_bytes': ('gauge', 'Disk used by the clone after cloning, by part (git, worktree).'),
+        'portfolio_startup_phase_seconds': ('gauge', 'Time spent in each startup phase (imports, clone, index, total).'),
+        'portfolio_git_maintenance_runs_total': ('counter', 'Background repository maintenance runs by outcome (success, failure, deferred).'),
+        'portfolio_repo_objects': ('gauge', 'Objects in the clone after the last maintenance run, by kind (loose, packed, packs).'),
+        'portfolio_response_bytes_total': ('counter', 'Bytes of compressed JSON responses before (identity) and after compression (gzip, br).'),
+    }
+
+    _lock = threading.Lock()
+    _values: Dict[Tuple[str, Tuple], float] = {}
+    # (name, labels) -> [bucket counts..., +Inf count, sum]
+    _histograms: Dict[Tuple[str, Tuple], List[float]] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Optional[Dict[str, str]]) -> Tuple[str, Tuple]:
+        return name, tuple(sorted((labels or {}).items()))
+
+    @staticmethod
+    def inc(name: str, labels: Optional[Dict[str, str]] = None, value: float = 1):
+        key = Metrics._key(name, labels)
+        with Metrics._lock:
+            Metrics._values[key] = Metrics._values.get(key, 0) + value
+
+    @staticmethod
+    def set(name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        key = Metrics._key(name, labels)
+        with Metrics._lock:
+            Metrics._values[key] = value
+
+    @staticmethod
+    def observe(name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        key = Metrics._key(name, labels)
+        index = bisect_left(Metrics.DURATION_BUCKETS, value)
+        with Metrics._lock:
+            histogram = Metrics._histograms.get(key)
+            if histogram is None:
+                histogram = Metrics._histograms[key] = [0] * (len(Metrics.DURATION_BUCKETS) + 2)
+            histogram[index] += 1
+            histogram[-1] += value
+
+    @staticmethod
+    @contextmanager
+    def timer(name: str, labels: Optional[Dict[str, str]] = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            Metrics.observe(name, time.perf_counter() - start, labels)
+
+    @staticmethod
+    def _format_labels(labels: Tuple, extra: Tuple = ()) -> str:
+        pairs = labels + extra
+        if not pairs:
+            return ""
+        escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+    @staticmethod
+    def render() -> str:
+        with Metrics._lock:
+            values = dict(Metrics._values)
+            histograms = {k: list(v) for k, v in Metrics._histograms.items()}
+        lines = []
+        for name, (kind, help_text) in Metrics.DEFINITIONS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == 'histogram':
+                for (metric, labels), counts in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(Metrics.DURATION_BUCKETS + (float('inf'),), counts[:-1]):
+                        cumulative += count
+                        le = "+Inf" if bound == float('inf') else repr(bound)
+                        lines.append(f"{name}_bucket{Metrics._format_labels(labels, (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{Metrics._format_labels(labels)} {counts[-1]}")
+                    lines.append(f"{name}_count{Metrics._format_labels(labels)} {cumulative}")
+            else:
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{Metrics._format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
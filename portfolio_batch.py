@@ -0,0 +1,194 @@
+import os
+import shutil
+from contextlib import ExitStack
+from typing import Dict, List, Optional, Tuple
+
+from ingest_jobs import IngestJobs
+from portfolio_manager import PortfolioManager
+from upload_sessions import UploadSessions, UploadSessionError
+
+class PortfolioBatch:
+    """Applies a list of create/update/delete operations as one change:
+
+        {"op": "create", "upload_id": "<completed upload session>", "fields": {...}}
+        {"op": "update", "folder_name": "w3", "fields": {"project_name": ..., "area": ...}}
+        {"op": "delete", "folder_name": "w5"}
+
+    Every operation is validated before anything is applied; if one is invalid the batch is
+    refused as a whole. The description file is then read and written once for the batch,
+    and the caller pushes all changed paths as a single commit."""
+    OPS = ('create', 'update', 'delete')
+    MAX_OPERATIONS = int(os.getenv('BATCH_MAX_OPERATIONS', '100'))
+
+    @staticmethod
+    def _result(index: int, op: Dict, success: bool, message: str, folder_name: Optional[str] = None) -> Dict:
+        return {'index': index, 'op': op.get('op') if isinstance(op, dict) else None,
+                'folder_name': folder_name or (op.get('folder_name') if isinstance(op, dict) else None),
+                'success': success, 'message': message}
+
+    @staticmethod
+    def _check(op, seen: set, load_error: Optional[str]) -> str:
+        """Error message for one operation, or '' if it can be applied."""
+        if not isinstance(op, dict) or op.get('op') not in PortfolioBatch.OPS:
+            return f"不支援的操作，必須是 {', '.join(PortfolioBatch.OPS)} 之一"
+        fields = op.get('fields', {})
+        if not isinstance(fields, dict):
+            return "fields 必須是物件"
+        unknown = [k for k in fields if k not in PortfolioManager.DESCRIPTION_FIELDS]
+        if unknown:
+            return f"不支援的欄位: {', '.join(unknown)}"
+        if op['op'] == 'create':
+            try:
+                session = UploadSessions.get(str(op.get('upload_id') or ''))
+            except UploadSessionError as e:
+                return str(e)
+            if session['kind'] != 'create':
+                return "上傳工作階段不是新增作品用的"
+            if session['status'] != 'open':
+                return "上傳工作階段已被使用"
+            if session['received'] != session['total']:
+                return "上傳工作階段尚有檔案未上傳完成"
+            if session['id'] in seen:
+                return "同一上傳工作階段在批次中只能使用一次"
+            seen.add(session['id'])
+            return ""
+
+        folder_name = str(op.get('folder_name') or '')
+        if not folder_name.startswith('w') or not folder_name[1:].isdigit():
+            return "無效的作品資料夾名稱"
+        if folder_name in seen:
+            return f"作品 {folder_name} 在批次中只能出現一次"
+        seen.add(folder_name)
+        described = PortfolioManager.DESCRIPTIONS.get(folder_name) is not None
+        if op['op'] == 'update':
+            if load_error:
+                return "作品描述json檔案不存在或格式错误"
+            if not described:
+                return f"未在作品描述json檔案中找到作品集 {folder_name}"
+        elif not described and not os.path.isdir(os.path.join(PortfolioManager._portfolio_root(), folder_name)):
+            return f"作品資料夾 {folder_name} 不存在"
+        return ""
+
+    @staticmethod
+    def validate(operations) -> List[str]:
+        """One error message per operation ('' when valid); a single message if the list itself is unusable."""
+        if not isinstance(operations, list) or not operations:
+            return ["缺少批次操作 (operations)"]
+        if len(operations) > PortfolioBatch.MAX_OPERATIONS:
+            return [f"一次最多 {PortfolioBatch.MAX_OPERATIONS} 項操作"]
+        load_error = PortfolioManager.DESCRIPTIONS.status()
+        if load_error in ("invalid_json", "not_list"):
+            # Every op rewrites the file, which would replace the unreadable content with a new list.
+            return ["作品描述json檔案格式错误，請先修正後再執行批次操作"] * len(operations)
+        seen = set()
+        return [PortfolioBatch._check(op, seen, load_error) for op in operations]
+
+    @staticmethod
+    def apply(operations) -> Tuple[bool, str, List[Dict]]:
+        """Returns (all succeeded, summary message, per-operation results)."""
+        errors = PortfolioBatch.validate(operations)
+        if not isinstance(operations, list) or len(errors) != len(operations):
+            return False, errors[0], []
+        if any(errors):
+            results = [PortfolioBatch._result(i, op, False, error or "未執行 (批次中有其他操作無效)")
+                       for i, (op, error) in enumerate(zip(operations, errors))]
+            return False, f"批次中有 {sum(1 for e in errors if e)} 項操作無效，未套用任何變更", results
+
+        results: List[Optional[Dict]] = [None] * len(operations)
+        puts, updates, deletes = {}, {}, []
+        existing = sorted({op['folder_name'] for op in operations if op['op'] != 'create'})
+        with ExitStack() as stack:
+            for folder_name in existing:
+                stack.enter_context(PortfolioManager.folder_lock(folder_name))
+
+            # Images first (slow), without holding the description lock.
+            for i, op in enumerate(operations):
+                fields = op.get('fields', {})
+                if op['op'] == 'create':
+                    folder_name, message = PortfolioBatch._create_images(op)
+                    if folder_name:
+                        session_fields = UploadSessions.get(op['upload_id'])['fields']
+                        data = dict(session_fields, **fields)
+                        puts[folder_name] = PortfolioManager.description_entry(folder_name, data)
+                        message = f"成功建立作品《{data.get('project_name', '')}》. {message}"
+                    results[i] = PortfolioBatch._result(i, op, bool(folder_name), message, folder_name)
+                elif op['op'] == 'update':
+                    updates[op['folder_name']] = {PortfolioManager.DESCRIPTION_FIELDS[k]: str(v) for k, v in fields.items()}
+                else:
+                    success, message = PortfolioManager._delete_folder_files(op['folder_name'])
+                    deletes.append(op['folder_name'])
+                    results[i] = PortfolioBatch._result(i, op, True, message if success else "已刪除作品描述")
+
+            # One read and one write of the description file for the whole batch.
+            store = PortfolioManager.DESCRIPTIONS
+            try:
+                with store.lock:
+                    found = store.apply(puts, updates, deletes)
+            except Exception as e:
+                print(f"Batch: writing {PortfolioManager.DESCRIPTION_FILE} failed: {e}")
+                found = None
+            for i, op in enumerate(operations):
+                if op['op'] == 'update':
+                    folder_name = op['folder_name']
+                    if found is None:
+                        results[i] = PortfolioBatch._result(i, op, False, "更新描述時出錯")
+                    elif found.get(folder_name):
+                        results[i] = PortfolioBatch._result(i, op, True, f"成功更新作品 {folder_name} 的描述")
+                    else:
+                        results[i] = PortfolioBatch._result(i, op, False, f"未在作品描述json檔案中找到作品集 {folder_name}")
+                elif found is None and results[i]['success']:
+                    # The images are written (or removed) but the description is not.
+                    results[i]['message'] += " 但寫入作品描述時出錯"
+                    results[i]['success'] = op['op'] == 'delete'
+
+            for folder_name in list(puts) + deletes + list(updates):
+                PortfolioManager._mark_changed(None if folder_name in updates else folder_name, description=found is not None)
+                PortfolioManager._index_refresh_folder(folder_name)
+
+        succeeded = sum(1 for r in results if r['success'])
+        message = f"批次操作完成：成功 {succeeded} 項"
+        if succeeded < len(results):
+            message += f"，失敗 {len(results) - succeeded} 項"
+        return succeeded == len(results), message, results
+
+    @staticmethod
+    def _create_images(op: Dict) -> Tuple[Optional[str], str]:
+        """Claim the upload session and write its images to a newly reserved folder.
+        Returns (folder_name or None, message)."""
+        try:
+            session, spooled = UploadSessions.claim(op['upload_id'])
+        except UploadSessionError as e:
+            return None, str(e)
+        if spooled is None:
+            return None, "上傳工作階段已被使用"
+        job_dir = os.path.join(IngestJobs.SPOOL_DIR, session['job_id'])
+        folder_name = None
+        try:
+            folder_name = PortfolioManager.reserve_portfolio_folder()
+            success, message = PortfolioManager.replace_portfolio_images(folder_name, spooled)
+            if not success:
+                shutil.rmtree(os.path.join(PortfolioManager._portfolio_root(), folder_name), ignore_errors=True)
+                return None, f"上傳圖片失敗: {message}"
+            return folder_name, message
+        except Exception as e:
+            if folder_name:
+                shutil.rmtree(os.path.join(PortfolioManager._portfolio_root(), folder_name), ignore_errors=True)
+            print(f"Batch: creating portfolio from upload {op['upload_id']} failed: {e}")
+            return None, f"建立作品時出現錯誤: {e}"
+        finally:
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+    @staticmethod
+    def commit_messages(operations: List[Dict], results: List[Dict]) -> List[str]:
+        """One commit message line per applied operation; GitPushQueue combines them."""
+        lines = []
+        for op, result in zip(operations, results):
+            if not result['success']:
+                continue
+            if op['op'] == 'create':
+                lines.append(f"Add portfolio: {result['folder_name']}")
+            elif op['op'] == 'update':
+                lines.append(f"Update portfolio: {op['folder_name']}")
+            else:
+                lines.append(f"Delete portfolio: {op['folder_name']}")
+        return lines
@@ -1,30 +1,156 @@
 import os
 import json
-from typing import List, Dict, Tuple
+import hashlib
+import itertools
+import math
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Callable, List, Dict, Optional, Tuple
 import shutil
+import threading
+import multiprocessing
+import time
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO 
 
+from description_store import DescriptionStore
+from file_lock import FileLock
+from metrics import Metrics
+from search_index import SearchIndex
+
+# Pillow is imported on the first image operation (PortfolioManager._pillow()), not at startup.
+Image = ImageChops = ImageOps = ImageStat = None
+_pillow_loaded = False
+
 try:
-    from PIL import Image, ImageChops, ImageOps
-except ImportError:
-    print("警告: Pillow 未安裝。圖片處理功能無法使用。请在終端機執行 'pip install Pillow'")
-    Image = None 
+    import resource
+except ImportError: # Windows
+    resource = None
 
 class PortfolioManager:
     BASE_DIR = os.path.join("resources", os.getenv('GITHUB_REPO_NAME'))
     PORTFOLIO_DIR = os.path.join("assets", "img", "portfolio")
     DESCRIPTION_FILE = os.path.join(BASE_DIR, "portfolio_description.json")
+    DESCRIPTIONS = DescriptionStore(DESCRIPTION_FILE, lock=FileLock.named("descriptions"))
+    # Number of processes used to encode uploads in parallel (<= 1 encodes inline).
+    IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', '0') or 0) or (os.cpu_count() or 1)
+    # Uploads are copied to disk and hashed in chunks of this size.
+    COPY_CHUNK_BYTES = 1024 * 1024
+    # Longest edge of stored images in px (0 = keep original size). JPEGs are
+    # decoded in draft mode at the smallest DCT scale that still covers it.
+    IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', '0') or 0)
+    # Downscaled copies (longest edge in px) served to the grid and carousel.
+    # They live outside the website repo so they are never committed.
+    DERIVATIVE_SIZES = {"thumb": 480, "medium": 1280}
+    DERIVATIVE_DIR = os.path.abspath(os.getenv('DERIVATIVE_CACHE_DIR', os.path.join("resources", ".derivatives")))
+    HASH_MANIFEST = os.path.join(DERIVATIVE_DIR, "content_hashes.json")
+    # WebP encoding. "fixed" saves every image at quality 75. "adaptive" searches each image's
+    # quality between IMAGE_QUALITY_MIN and IMAGE_QUALITY_MAX for the lowest one reaching
+    # IMAGE_TARGET_PSNR (dB) and/or the highest one fitting IMAGE_BYTE_BUDGET_KB (the budget
+    # wins if both are set). Probes use the fastest encoder method; the final encode uses
+    # IMAGE_WEBP_METHOD (0-6). Floor plans (0.webp) also try lossless, which suits line art.
+    IMAGE_ENCODING = os.getenv('IMAGE_ENCODING', 'fixed').lower()
+    IMAGE_QUALITY = 75
+    IMAGE_QUALITY_MIN = int(os.getenv('IMAGE_QUALITY_MIN', '40'))
+    IMAGE_QUALITY_MAX = int(os.getenv('IMAGE_QUALITY_MAX', '90'))
+    IMAGE_BYTE_BUDGET = int(os.getenv('IMAGE_BYTE_BUDGET_KB', '0') or 0) * 1024
+    IMAGE_TARGET_PSNR = float(os.getenv('IMAGE_TARGET_PSNR', '0') or 0) or (0 if IMAGE_BYTE_BUDGET else 36.0)
+    IMAGE_WEBP_METHOD = int(os.getenv('IMAGE_WEBP_METHOD', '4'))
+    # Optionally also write N.avif next to each N.webp (needs Pillow with AVIF or pillow-avif-plugin).
+    IMAGE_AVIF = os.getenv('IMAGE_AVIF', '').lower() in ('1', 'true', 'yes')
+    IMAGE_AVIF_QUALITY = int(os.getenv('IMAGE_AVIF_QUALITY', '50'))
+    _avif_warned = False
+    _image_pool = None
+    _image_pool_lock = threading.Lock()
+
+    # --- In-memory portfolio index ---
+    # folder_name -> item dict, rebuilt only when the signature (mtimes of the
+    # portfolio root, the description file and .git/index, plus the shared change
+    # stamp) changes, e.g. after a git pull. Create/update/delete paths refresh
+    # single entries in place.
+    _index_lock = threading.RLock()
+    _index_items: Dict[str, Dict] = {}
+    _index_sorted: List[Dict] = []
+    _index_signature = None
+    # Rewritten with a unique token on every local mutation so other worker processes
+    # notice changes that leave the stat signature alone (e.g. same-name image replace).
+    CHANGE_STAMP = os.path.join(FileLock.STATE_DIR, "portfolio.stamp")
+    _stamp_seen = None # stamp token the index reflects, including this process's own bumps
+    _stamp_counter = itertools.count()
+    # Secondary indexes rebuilt with the sort (O(n) per change, never per request):
+    # ascending orders per sort key, folder -> position, 種類/區域 -> folders, normalized dates.
+    SORT_KEYS = ('folder_num', 'date', 'name')
+    _index_orders: Dict[str, List[str]] = {}
+    _index_positions: Dict[str, Dict[str, int]] = {}
+    _index_by_type: Dict[str, set] = {}
+    _index_by_area: Dict[str, set] = {}
+    _index_dates: Dict[str, str] = {}
+    _index_date_order: List[str] = []
+    _index_digest = ""
+    # folder -> summary item (metadata, cover image and image count) for list views.
+    _index_summaries: Dict[str, Dict] = {}
+    VIEWS = ('full', 'summary')
+    # Character-bigram full-text index over name/description/區域/種類, kept in step with
+    # _index_items (rebuilt with it, e.g. after a pull, and refreshed per folder).
+    _search = SearchIndex()
+
+    # Repo-relative paths touched by mutations since the last pop_changed_paths(),
+    # so the git layer can stage exactly these instead of `git add .`.
+    _changed_paths = set()
+    _changed_paths_lock = threading.Lock()
+
+    # Per-folder locks so parallel uploads/edits of different projects never block each other
+    # while two requests on the same wN (in any worker process) are serialized.
+    _folder_locks: Dict[str, FileLock] = {}
+    _folder_locks_guard = threading.Lock()
+
+    # --- Content hashes for cache busting / ETags ---
+    # relpath under BASE_DIR -> (mtime_ns, size, hash); persisted so restarts do not rehash.
+    _hash_lock = threading.Lock()
+    _hashes = None
+    _hashes_dirty = False
 
     # --- Image Processing Helper Functions ---
+    @staticmethod
+    def _pillow() -> bool:
+        """Import Pillow on first use. Returns False if it is not installed."""
+        global Image, ImageChops, ImageOps, ImageStat, _pillow_loaded
+        if not _pillow_loaded:
+            try:
+                from PIL import Image as _Image, ImageChops as _ImageChops, ImageOps as _ImageOps, ImageStat as _ImageStat
+                # Image last: other threads treat it as the signal that the rest is set.
+                ImageChops, ImageOps, ImageStat, Image = _ImageChops, _ImageOps, _ImageStat, _Image
+            except ImportError:
+                print("警告: Pillow 未安裝。圖片處理功能無法使用。请在終端機執行 'pip install Pillow'")
+            try:
+                import pillow_avif # registers AVIF with Pillow versions that lack it
+            except ImportError:
+                pass
+            _pillow_loaded = True
+        return Image is not None
+
+    # A pixel is content when any channel is darker than this (same rule as the
+    # original difference-from-white / add(-100) test).
+    TRIM_THRESHOLD = 155
+
+    @staticmethod
+    def _find_content_bbox(img_rgb):
+        """Exact bbox of the content of an RGB image, or None if it is blank.
+        One lookup-table pass marks dark channels and getbbox() scans for any marked
+        channel, instead of building a white image and two difference images."""
+        lut = [255 if v < PortfolioManager.TRIM_THRESHOLD else 0 for v in range(256)] * 3
+        return img_rgb.point(lut).getbbox()
+
     @staticmethod
     def _trim_whitespace(img, border=10):
-        if not Image: return img 
+        if not PortfolioManager._pillow(): return img 
         try:
-            img_rgb = img.convert("RGB")
-            bg = Image.new("RGB", img_rgb.size, (255, 255, 255))
-            diff = ImageChops.difference(img_rgb, bg)
-            diff = ImageChops.add(diff, diff, 2.0, -100)
-            bbox = diff.getbbox() 
+            img_rgb = img if img.mode == "RGB" else img.convert("RGB")
+            bbox = PortfolioManager._find_content_bbox(img_rgb)
             if bbox:
                 img_cropped = img_rgb.crop(bbox)
                 img_expanded = ImageOps.expand(img_cropped, border=border, fill="white")
@@ -37,7 +163,7 @@ class PortfolioManager:
 
     @staticmethod
     def _resize_and_center_image(img_to_resize, canvas_size):
-        if not Image: return img_to_resize 
+        if not PortfolioManager._pillow(): return img_to_resize 
         try:
             img = PortfolioManager._trim_whitespace(img_to_resize, border=10)
             img_ratio = img.width / img.height
@@ -59,57 +185,338 @@ class PortfolioManager:
         except Exception as e:
             print(f"  _resize_and_center_image: Error during resize/center: {e}") 
             return img_to_resize.convert("RGB") 
+
+    @staticmethod
+    def _bounded_size(size: Tuple[int, int]) -> Tuple[int, int]:
+        """Output size of an image after applying IMAGE_MAX_DIMENSION."""
+        max_dim = PortfolioManager.IMAGE_MAX_DIMENSION
+        width, height = size
+        if not max_dim or max(width, height) <= max_dim:
+            return size
+        scale = max_dim / max(width, height)
+        return (max(1, round(width * scale)), max(1, round(height * scale)))
+
+    @staticmethod
+    def _reset_peak_rss():
+        # Linux only: writing 5 to clear_refs resets VmHWM so the next reading is per image.
+        try:
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+        except OSError:
+            pass
+
+    @staticmethod
+    def _peak_rss_mb() -> float:
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        if resource:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return 0.0
+
+    @staticmethod
+    def _open_bounded(source_path: str):
+        """Decode an upload to RGB at no more than IMAGE_MAX_DIMENSION. Returns (image, source size)."""
+        with Image.open(source_path) as img:
+            source_size = img.size
+            target_size = PortfolioManager._bounded_size(source_size)
+            if target_size != source_size:
+                if img.format == "JPEG":
+                    img.draft("RGB", target_size) # libjpeg scales by 1/2..1/8 while decoding
+                img_rgb = img.convert("RGB")
+                if img_rgb.size != target_size:
+                    img_rgb = img_rgb.resize(target_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+            else:
+                img_rgb = img.convert("RGB")
+        return img_rgb, source_size
+
+    @staticmethod
+    def _derivative_path(size_name: str, folder_name: str, filename: str) -> str:
+        return os.path.join(PortfolioManager.DERIVATIVE_DIR, size_name, folder_name, filename)
+
+    @staticmethod
+    def _save_derivatives(img, folder_name: str, filename: str, sizes=None):
+        """Write thumbnail/medium WebP copies of an already decoded image.
+        Each file is written to a temp name and renamed so readers never see a partial file."""
+        for size_name in (sizes or PortfolioManager.DERIVATIVE_SIZES):
+            max_dim = PortfolioManager.DERIVATIVE_SIZES[size_name]
+            path = PortfolioManager._derivative_path(size_name, folder_name, filename)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            derivative = img.copy()
+            derivative.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            derivative.save(tmp_path, format='WEBP', quality=70)
+            os.replace(tmp_path, path)
+
+    @staticmethod
+    def _remove_derivatives(folder_name: str):
+        for size_name in PortfolioManager.DERIVATIVE_SIZES:
+            folder_path = os.path.join(PortfolioManager.DERIVATIVE_DIR, size_name, folder_name)
+            if os.path.isdir(folder_path):
+                shutil.rmtree(folder_path, ignore_errors=True)
+
+    @staticmethod
+    def get_derivative(size_name: str, folder_name: str, filename: str):
+        """Return the path of a derivative image, generating it on first request
+        (or when the source is newer than the cached copy). None if there is no source."""
+        if not PortfolioManager._pillow() or size_name not in PortfolioManager.DERIVATIVE_SIZES:
+            return None
+        if folder_name != os.path.basename(folder_name) or filename != os.path.basename(filename) or not filename.lower().endswith('.webp'):
+            return None
+        source_path = os.path.join(PortfolioManager._portfolio_root(), folder_name, filename)
+        try:
+            source_mtime = os.stat(source_path).st_mtime_ns
+        except OSError:
+            return None
+        path = PortfolioManager._derivative_path(size_name, folder_name, filename)
+        try:
+            if os.stat(path).st_mtime_ns >= source_mtime:
+                return path
+        except OSError:
+            pass
+        try:
+            with Image.open(source_path) as img:
+                max_dim = PortfolioManager.DERIVATIVE_SIZES[size_name]
+                img.draft("RGB", (max_dim, max_dim))
+                PortfolioManager._save_derivatives(img.convert("RGB"), folder_name, filename, sizes=[size_name])
+            return path
+        except Exception as e:
+            print(f"產生縮圖 {size_name}/{folder_name}/{filename} 時出錯: {e}")
+            return None
+
+    @staticmethod
+    def _avif_supported() -> bool:
+        if not PortfolioManager._pillow():
+            return False
+        Image.init()
+        if 'AVIF' in Image.SAVE:
+            return True
+        if not PortfolioManager._avif_warned:
+            PortfolioManager._avif_warned = True
+            print("警告: 此 Pillow 版本不支援 AVIF，僅輸出 WebP。請升級 Pillow 或執行 'pip install pillow-avif-plugin'")
+        return False
+
+    @staticmethod
+    def _avif_sibling(filename: str) -> str:
+        return os.path.splitext(filename)[0] + ".avif"
+
+    @staticmethod
+    def _encoding_key() -> str:
+        """Identifies the encoder settings; a stored image made with other settings is re-encoded."""
+        if PortfolioManager.IMAGE_ENCODING == 'adaptive':
+            key = (f"webp:adaptive:{PortfolioManager.IMAGE_QUALITY_MIN}-{PortfolioManager.IMAGE_QUALITY_MAX}:"
+                   f"psnr{PortfolioManager.IMAGE_TARGET_PSNR:g}:budget{PortfolioManager.IMAGE_BYTE_BUDGET}:m{PortfolioManager.IMAGE_WEBP_METHOD}")
+        else:
+            key = f"webp:q{PortfolioManager.IMAGE_QUALITY}"
+        if PortfolioManager.IMAGE_AVIF:
+            key += f"+avif:q{PortfolioManager.IMAGE_AVIF_QUALITY}"
+        return key
+
+    @staticmethod
+    def _webp_bytes(img, quality: int, method: int, lossless: bool = False) -> bytes:
+        buf = BytesIO()
+        img.save(buf, format='WEBP', quality=quality, method=method, lossless=lossless)
+        return buf.getvalue()
+
+    @staticmethod
+    def _psnr(reference, encoded: bytes) -> float:
+        with Image.open(BytesIO(encoded)) as decoded:
+            diff = ImageChops.difference(reference, decoded.convert("RGB"))
+        mse = sum(rms * rms for rms in ImageStat.Stat(diff).rms) / 3
+        return float('inf') if mse == 0 else 10 * math.log10(255 * 255 / mse)
+
+    @staticmethod
+    def _search_quality(accept: Callable[[int], bool], lowest_passing: bool) -> Optional[int]:
+        """Binary search over the quality range for the lowest quality accept() passes
+        (accept grows with quality) or the highest (accept shrinks with quality)."""
+        lo, hi, found = PortfolioManager.IMAGE_QUALITY_MIN, PortfolioManager.IMAGE_QUALITY_MAX, None
+        while lo <= hi:
+            q = (lo + hi) // 2
+            if accept(q):
+                found = q
+                if lowest_passing:
+                    hi = q - 1
+                else:
+                    lo = q + 1
+            elif lowest_passing:
+                lo = q + 1
+            else:
+                hi = q - 1
+        return found
+
+    @staticmethod
+    def _choose_webp(img, floor_plan: bool = False) -> Tuple[bytes, Dict]:
+        """Encode img as WebP per IMAGE_ENCODING. Returns the bytes and {quality, lossless, probes}."""
+        if PortfolioManager.IMAGE_ENCODING != 'adaptive':
+            buf = BytesIO()
+            img.save(buf, format='WEBP', quality=PortfolioManager.IMAGE_QUALITY)
+            return buf.getvalue(), {'quality': PortfolioManager.IMAGE_QUALITY, 'lossless': False, 'probes': 0}
+
+        probes = {}
+        def probe(q):
+            if q not in probes:
+                probes[q] = PortfolioManager._webp_bytes(img, q, method=0)
+            return probes[q]
+
+        budget, target = PortfolioManager.IMAGE_BYTE_BUDGET, PortfolioManager.IMAGE_TARGET_PSNR
+        quality = PortfolioManager.IMAGE_QUALITY_MAX
+        if target:
+            found = PortfolioManager._search_quality(lambda q: PortfolioManager._psnr(img, probe(q)) >= target, lowest_passing=True)
+            quality = found if found is not None else PortfolioManager.IMAGE_QUALITY_MAX
+        if budget:
+            found = PortfolioManager._search_quality(lambda q: len(probe(q)) <= budget, lowest_passing=False)
+            quality = min(quality, found if found is not None else PortfolioManager.IMAGE_QUALITY_MIN)
+        encoded = PortfolioManager._webp_bytes(img, quality, method=PortfolioManager.IMAGE_WEBP_METHOD)
+        info = {'quality': quality, 'lossless': False, 'probes': len(probes)}
+        if floor_plan:
+            lossless = PortfolioManager._webp_bytes(img, 80, method=PortfolioManager.IMAGE_WEBP_METHOD, lossless=True)
+            if len(lossless) < len(encoded):
+                encoded, info = lossless, dict(info, lossless=True)
+        return encoded, info
+
+    @staticmethod
+    def _write_atomic(path: str, write: Callable[[str], object]):
+        """Call write(tmp_path) for a temp file next to `path`, then rename it into place,
+        so a crashed or killed worker never leaves a truncated image behind."""
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def _encode_webp_job(source_path: str, file_path: str, canvas_size=None) -> Tuple[bool, str, Dict]:
+        """Decode one uploaded image and save it as WebP (and AVIF if enabled). Runs inside a pool worker,
+        which reads the upload from source_path itself. If canvas_size is given (the 0.webp floor plan), trim and center it on that canvas first.
+        Also returns per-stage seconds, byte counts and the chosen quality; the parent records
+        them as metrics and sums the savings per upload."""
+        stats = {}
+        try:
+            stats['bytes_in'] = os.path.getsize(source_path)
+            if not PortfolioManager._pillow():
+                return False, "Pillow is not installed", stats
+            PortfolioManager._reset_peak_rss()
+            start = time.perf_counter()
+            img_rgb, source_size = PortfolioManager._open_bounded(source_path)
+            stats['decode'] = time.perf_counter() - start
+            if canvas_size:
+                start = time.perf_counter()
+                img_rgb = PortfolioManager._resize_and_center_image(img_rgb, canvas_size)
+                stats['trim'] = time.perf_counter() - start
+            start = time.perf_counter()
+            encoded, info = PortfolioManager._choose_webp(img_rgb, floor_plan=os.path.basename(file_path) == "0.webp")
+            def write_webp(tmp_path):
+                with open(tmp_path, 'wb') as f:
+                    f.write(encoded)
+            PortfolioManager._write_atomic(file_path, write_webp)
+            stats['encode'] = time.perf_counter() - start
+            stats['bytes_out'] = len(encoded)
+            stats.update(info)
+            avif_path = PortfolioManager._avif_sibling(file_path)
+            if PortfolioManager.IMAGE_AVIF and PortfolioManager._avif_supported():
+                PortfolioManager._write_atomic(avif_path, lambda tmp_path: img_rgb.save(
+                    tmp_path, format='AVIF', quality=PortfolioManager.IMAGE_AVIF_QUALITY))
+                stats['avif_bytes'] = os.path.getsize(avif_path)
+            elif os.path.exists(avif_path):
+                os.remove(avif_path) # would no longer match the new WebP
+            start = time.perf_counter()
+            PortfolioManager._save_derivatives(img_rgb, os.path.basename(os.path.dirname(file_path)), os.path.basename(file_path))
+            stats['derivatives'] = time.perf_counter() - start
+            print(f"  {os.path.basename(file_path)}: {source_size[0]}x{source_size[1]} -> {img_rgb.width}x{img_rgb.height}, "
+                  f"{'lossless' if info['lossless'] else 'q' + str(info['quality'])} {stats['bytes_in']} -> {len(encoded)} bytes, "
+                  f"peak RSS {PortfolioManager._peak_rss_mb():.1f} MB")
+            return True, "", stats
+        except Exception as e:
+            return False, str(e), stats
+
+    @staticmethod
+    def _record_image_stats(ok: bool, stats: Dict):
+        Metrics.inc('portfolio_images_processed_total', {'result': 'ok' if ok else 'error'})
+        for stage in ('decode', 'trim', 'encode', 'derivatives'):
+            if stage in stats:
+                Metrics.observe('portfolio_image_stage_duration_seconds', stats[stage], {'stage': stage})
+        Metrics.inc('portfolio_image_bytes_total', {'direction': 'in'}, stats.get('bytes_in', 0))
+        Metrics.inc('portfolio_image_bytes_total', {'direction': 'out'}, stats.get('bytes_out', 0))
+        if 'avif_bytes' in stats:
+            Metrics.inc('portfolio_image_bytes_total', {'direction': 'out_avif'}, stats['avif_bytes'])
+
+    @staticmethod
+    def _get_image_pool():
+        if PortfolioManager.IMAGE_WORKERS <= 1:
+            return None
+        with PortfolioManager._image_pool_lock:
+            if PortfolioManager._image_pool is None:
+                # spawn: forking a threaded Flask process can inherit held locks
+                PortfolioManager._image_pool = ProcessPoolExecutor(
+                    max_workers=PortfolioManager.IMAGE_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"))
+            return PortfolioManager._image_pool
+
+    @staticmethod
+    def _run_image_jobs(jobs: List[Tuple], progress: Optional[Callable] = None) -> List[Tuple[bool, str, Dict]]:
+        """Run _encode_webp_job for every (source_path, file_path, canvas_size) tuple, in parallel
+        when a pool is configured. Results (ok, error, stats) are returned in job order;
+        progress(job_index, ok, error) is called as each job finishes."""
+        results = [None] * len(jobs)
+        def finished(index, result):
+            ok, err, stats = result
+            PortfolioManager._record_image_stats(ok, stats)
+            results[index] = result
+            if progress:
+                progress(index, ok, err)
+
+        pool = PortfolioManager._get_image_pool()
+        if pool is not None and len(jobs) > 1:
+            try:
+                futures = {pool.submit(PortfolioManager._encode_webp_job, *job): i for i, job in enumerate(jobs)}
+                for future in as_completed(futures):
+                    finished(futures[future], future.result())
+                return results
+            except BrokenProcessPool as e:
+                print(f"圖片處理程序池異常，改為單一程序處理: {e}")
+                with PortfolioManager._image_pool_lock:
+                    PortfolioManager._image_pool = None
+        for i, job in enumerate(jobs):
+            if results[i] is None:
+                finished(i, PortfolioManager._encode_webp_job(*job))
+        return results
     # --- End Image Processing ---
 
     @staticmethod
     def load_descriptions() -> Dict[str, Dict]:
-        descriptions = {}
         try:
-            with open(PortfolioManager.DESCRIPTION_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                for item in data:
-                    img_link = item.get("圖片連結", "")
-                    if img_link:
-                        folder_key = img_link.strip('/').split('/')[-1]
-                        if folder_key and folder_key.startswith('w'):
-                            descriptions[folder_key] = item
-        except FileNotFoundError:
-            pass 
-        except json.JSONDecodeError as e:
-            print(f"作品描述json檔案錯誤: {PortfolioManager.DESCRIPTION_FILE}: {e}")
+            return PortfolioManager.DESCRIPTIONS.by_folder()
         except Exception as e:
             print(f"載入作品描述json檔案時發生錯誤: {e}")
-        return descriptions
+            return {}
+
+    # API field -> key in portfolio_description.json
+    DESCRIPTION_FIELDS = {"project_name": "專案名", "description": "描述", "area": "區域",
+                          "date": "日期", "size": "坪數", "type": "種類"}
+
+    @staticmethod
+    def description_entry(folder_name: str, data: Dict) -> Dict:
+        entry = {"專案名": data.get("project_name", ""), "圖片連結": f"./assets/img/portfolio/{folder_name}/"}
+        entry.update({key: data.get(field, "") for field, key in PortfolioManager.DESCRIPTION_FIELDS.items() if field != "project_name"})
+        return entry
 
     @staticmethod
     def add_description_entry(folder_name: str, data: Dict) -> bool:
         try:
-            entries = []
-            if os.path.exists(PortfolioManager.DESCRIPTION_FILE):
-                try:
-                    with open(PortfolioManager.DESCRIPTION_FILE, 'r', encoding='utf-8') as f:
-                        entries = json.load(f)
-                    if not isinstance(entries, list): 
-                        print(f"警告: 作品描述json檔案是陣列，重置為空陣列。")
-                        entries = []
-                except json.JSONDecodeError:
-                     print(f"警告: 作品描述json檔案錯誤，重置為空陣列。")
-                     entries = []
-
-            new_entry = {
-                "專案名": data.get("project_name", ""),
-                "圖片連結": f"./assets/img/portfolio/{folder_name}/",
-                "描述": data.get("description", ""),
-                "區域": data.get("area", ""),
-                "日期": data.get("date", ""),
-                "坪數": data.get("size", ""),
-                "種類": data.get("type", "")
-            }
-            entries = [e for e in entries if e.get("圖片連結", "").strip('/').split('/')[-1] != folder_name]
-            entries.append(new_entry)
-
-            with open(PortfolioManager.DESCRIPTION_FILE, 'w', encoding='utf-8') as f:
-                json.dump(entries, f, ensure_ascii=False, indent=4) 
+            new_entry = PortfolioManager.description_entry(folder_name, data)
+            store = PortfolioManager.DESCRIPTIONS
+            with store.lock:
+                if store.status() in ("invalid_json", "not_list"):
+                    print(f"警告: 作品描述json檔案錯誤或不是陣列，重置為空陣列。")
+                store.put(folder_name, new_entry)
+            PortfolioManager._mark_changed(description=True)
+            PortfolioManager._index_refresh_folder(folder_name)
             return True
         except Exception as e:
             print(f"新增作品描述到 {PortfolioManager.DESCRIPTION_FILE} 時出現錯誤: {e}")
@@ -117,71 +524,406 @@ class PortfolioManager:
 
     @staticmethod
     def update_description_entry(folder_name: str, data: Dict) -> Tuple[bool, str]:
+        with PortfolioManager.folder_lock(folder_name):
+            return PortfolioManager._update_description_entry(folder_name, data)
+
+    @staticmethod
+    def _update_description_entry(folder_name: str, data: Dict) -> Tuple[bool, str]:
         try:
-            entries = []
-            if not os.path.exists(PortfolioManager.DESCRIPTION_FILE):
-                return False, "作品描述json檔案不存在"
-            with open(PortfolioManager.DESCRIPTION_FILE, 'r', encoding='utf-8') as f:
-                entries = json.load(f)
-            if not isinstance(entries, list):
-                return False, "作品描述json檔案格式错误 (非陣列)"
-            found = False
-            for i, entry in enumerate(entries):
-                entry_folder = entry.get("圖片連結", "").strip('/').split('/')[-1]
-                if entry_folder == folder_name:
-                    entries[i]["專案名"] = data.get("project_name", entry.get("專案名", ""))
-                    entries[i]["描述"] = data.get("description", entry.get("描述", ""))
-                    entries[i]["區域"] = data.get("area", entry.get("區域", ""))
-                    entries[i]["日期"] = data.get("date", entry.get("日期", ""))
-                    entries[i]["坪數"] = data.get("size", entry.get("坪數", ""))
-                    entries[i]["種類"] = data.get("type", entry.get("種類", ""))
-                    found = True
-                    break
-            if not found:
-                return False, f"未在作品描述json檔案中找到作品集 {folder_name} - {data.get('project_name', '')}"
-            with open(PortfolioManager.DESCRIPTION_FILE, 'w', encoding='utf-8') as f:
-                json.dump(entries, f, ensure_ascii=False, indent=4)
+            store = PortfolioManager.DESCRIPTIONS
+            with store.lock:
+                load_error = store.status()
+                if load_error == "missing":
+                    return False, "作品描述json檔案不存在"
+                if load_error == "not_list":
+                    return False, "作品描述json檔案格式错误 (非陣列)"
+                if load_error == "invalid_json":
+                    return False, "作品描述json檔案格式错误"
+                entry = store.get(folder_name)
+                if entry is None:
+                    return False, f"未在作品描述json檔案中找到作品集 {folder_name} - {data.get('project_name', '')}"
+                store.update(folder_name, {
+                    "專案名": data.get("project_name", entry.get("專案名", "")),
+                    "描述": data.get("description", entry.get("描述", "")),
+                    "區域": data.get("area", entry.get("區域", "")),
+                    "日期": data.get("date", entry.get("日期", "")),
+                    "坪數": data.get("size", entry.get("坪數", "")),
+                    "種類": data.get("type", entry.get("種類", "")),
+                })
+            PortfolioManager._mark_changed(description=True)
+            PortfolioManager._index_refresh_folder(folder_name)
             return True, f"成功更新作品《{data.get('project_name', '')}》的描述"
-        except json.JSONDecodeError:
-            return False, "作品描述json檔案格式错误"
         except Exception as e:
             print(f"更新描述 {PortfolioManager.DESCRIPTION_FILE} 時出错 for {folder_name}: {e}")
             return False, f"更新描述時出錯: {e}"
 
     @staticmethod
-    def get_portfolio_items() -> List[Dict]:
-        items = []
-        portfolio_path = os.path.join(PortfolioManager.BASE_DIR, PortfolioManager.PORTFOLIO_DIR)
+    def _mark_changed(folder_name: str = None, description: bool = False):
+        paths = []
+        if folder_name:
+            paths.append("/".join(PortfolioManager.PORTFOLIO_DIR.split(os.sep) + [folder_name]))
+        if description:
+            paths.append(os.path.basename(PortfolioManager.DESCRIPTION_FILE))
+        with PortfolioManager._changed_paths_lock:
+            PortfolioManager._changed_paths.update(paths)
+        PortfolioManager._bump_change_stamp()
+
+    @staticmethod
+    def _read_change_stamp() -> Optional[str]:
+        try:
+            with open(PortfolioManager.CHANGE_STAMP, 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    @staticmethod
+    def _bump_change_stamp():
+        """Publish a local mutation to other workers. If the stamp moved since this process
+        last looked, another worker changed something too and the index is rebuilt."""
+        token = f"{os.getpid()}-{time.time_ns()}-{next(PortfolioManager._stamp_counter)}"
+        with PortfolioManager._index_lock:
+            if PortfolioManager._read_change_stamp() != PortfolioManager._stamp_seen:
+                PortfolioManager._index_signature = None
+            try:
+                os.makedirs(os.path.dirname(PortfolioManager.CHANGE_STAMP), exist_ok=True)
+                tmp_path = f"{PortfolioManager.CHANGE_STAMP}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(token)
+                os.replace(tmp_path, PortfolioManager.CHANGE_STAMP)
+                PortfolioManager._stamp_seen = token
+            except OSError as e:
+                print(f"無法更新變更標記 {PortfolioManager.CHANGE_STAMP}: {e}")
+                PortfolioManager._index_signature = None
+
+    @staticmethod
+    def pop_changed_paths() -> List[str]:
+        """Return and clear the repo-relative paths modified since the last call."""
+        with PortfolioManager._changed_paths_lock:
+            paths = sorted(PortfolioManager._changed_paths)
+            PortfolioManager._changed_paths.clear()
+        return paths
+
+    @staticmethod
+    def _portfolio_root() -> str:
+        return os.path.join(PortfolioManager.BASE_DIR, PortfolioManager.PORTFOLIO_DIR)
+
+    @staticmethod
+    def _stat_key(path: str):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _index_current_signature() -> Tuple:
+        """Cheap change detector: three stat calls instead of a full rescan.
+        The root mtime changes when wN folders are added/removed, the description
+        file when it is rewritten, .git/index whenever a pull/checkout touches
+        files inside existing folders, and the change stamp on any worker's write."""
+        return (
+            PortfolioManager._stat_key(PortfolioManager._portfolio_root()),
+            PortfolioManager._stat_key(PortfolioManager.DESCRIPTION_FILE),
+            PortfolioManager._stat_key(os.path.join(PortfolioManager.BASE_DIR, ".git", "index")),
+            PortfolioManager._read_change_stamp(),
+        )
+
+    @staticmethod
+    def _load_hash_manifest():
+        try:
+            with open(PortfolioManager.HASH_MANIFEST, 'r', encoding='utf-8') as f:
+                return {k: tuple(v) for k, v in json.load(f).items()}
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def save_hash_manifest():
+        with PortfolioManager._hash_lock:
+            if not PortfolioManager._hashes_dirty:
+                return
+            snapshot = dict(PortfolioManager._hashes)
+            PortfolioManager._hashes_dirty = False
+        try:
+            os.makedirs(os.path.dirname(PortfolioManager.HASH_MANIFEST), exist_ok=True)
+            tmp_path = f"{PortfolioManager.HASH_MANIFEST}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, PortfolioManager.HASH_MANIFEST)
+        except OSError as e:
+            print(f"無法寫入圖片雜湊快取 {PortfolioManager.HASH_MANIFEST}: {e}")
+
+    @staticmethod
+    def get_content_hash(path: str):
+        """Short sha256 of a file under BASE_DIR. Only rehashed when mtime/size change,
+        so callers on the request path pay one stat and a dict lookup."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = os.path.relpath(os.path.abspath(path), os.path.abspath(PortfolioManager.BASE_DIR))
+        with PortfolioManager._hash_lock:
+            if PortfolioManager._hashes is None:
+                PortfolioManager._hashes = PortfolioManager._load_hash_manifest()
+            cached = PortfolioManager._hashes.get(key)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        digest = hashlib.sha256()
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        content_hash = digest.hexdigest()[:16]
+        with PortfolioManager._hash_lock:
+            PortfolioManager._hashes[key] = (st.st_mtime_ns, st.st_size, content_hash)
+            PortfolioManager._hashes_dirty = True
+        return content_hash
+
+    @staticmethod
+    def _scan_portfolio_folder(item_dir: str, descriptions: Dict[str, Dict]):
+        """Build the item dict for one wN folder, or None if it has no images."""
+        dir_path = os.path.join(PortfolioManager._portfolio_root(), item_dir)
+        if not item_dir.startswith('w') or not os.path.isdir(dir_path):
+            return None
+        try:
+            folder_num = int(item_dir[1:])
+        except ValueError:
+            return None
+        images = []
+        filenames_sorted = sorted(os.listdir(dir_path), key=lambda name: int(name.split('.')[0]) if name.split('.')[0].isdigit() else float('inf'))
+        for filename in filenames_sorted: 
+            filepath = os.path.join(dir_path, filename)
+            if os.path.isfile(filepath) and filename.lower().endswith('.webp'):
+                version = PortfolioManager.get_content_hash(filepath)
+                images.append({ 'name': filename, 'path': f"/assets/img/portfolio/{item_dir}/{filename}?v={version}",
+                                'thumb': f"/derivatives/thumb/{item_dir}/{filename}?v={version}",
+                                'medium': f"/derivatives/medium/{item_dir}/{filename}?v={version}",
+                                'hash': version })
+        if not images:
+            return None
+        desc_data = descriptions.get(item_dir, {}) 
+        return {
+            'name': desc_data.get("專案名", f"作品集 {item_dir[1:]}"), 
+            'folder': item_dir, 'folder_num': folder_num, 'images': images,
+            'description': desc_data.get("描述", ""), 'area': desc_data.get("區域", ""),
+            'date': desc_data.get("日期", ""), 'size': desc_data.get("坪數", ""),
+            'type': desc_data.get("種類", "")
+        }
+
+    @staticmethod
+    def normalize_date(value: str) -> str:
+        """'2023/5' -> '2023-05', '2023.05.01' -> '2023-05-01'; '' if there is no 4-digit year."""
+        parts = re.findall(r'\d+', value or '')
+        if not parts or len(parts[0]) != 4:
+            return ''
+        return parts[0] + ''.join(f"-{int(p):02d}" for p in parts[1:3])
+
+    @staticmethod
+    def _index_resort():
+        items = PortfolioManager._index_items
+        dates = {folder: PortfolioManager.normalize_date(item['date']) for folder, item in items.items()}
+        orders = {
+            'folder_num': sorted(items, key=lambda f: items[f]['folder_num']),
+            'date': sorted(items, key=lambda f: (dates[f], items[f]['folder_num'])),
+            'name': sorted(items, key=lambda f: (items[f]['name'], items[f]['folder_num'])),
+        }
+        by_type, by_area = defaultdict(set), defaultdict(set)
+        for folder, item in items.items():
+            by_type[item['type']].add(folder)
+            by_area[item['area']].add(folder)
+        PortfolioManager._index_orders = orders
+        PortfolioManager._index_positions = {key: {f: i for i, f in enumerate(order)} for key, order in orders.items()}
+        PortfolioManager._index_by_type = dict(by_type)
+        PortfolioManager._index_by_area = dict(by_area)
+        PortfolioManager._index_dates = dates
+        PortfolioManager._index_date_order = [dates[f] for f in orders['date']]
+        PortfolioManager._index_summaries = {folder: PortfolioManager._summary_item(item) for folder, item in items.items()}
+        PortfolioManager._index_sorted = [items[f] for f in reversed(orders['folder_num'])]
+        listing = json.dumps(PortfolioManager._index_sorted, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        PortfolioManager._index_digest = hashlib.sha1(listing).hexdigest()[:16]
+
+    @staticmethod
+    def _summary_item(item: Dict) -> Dict:
+        summary = {key: value for key, value in item.items() if key != 'images'}
+        summary['cover'] = {key: item['images'][0][key] for key in ('name', 'path', 'thumb')}
+        summary['image_count'] = len(item['images'])
+        return summary
+
+    @staticmethod
+    def _rebuild_index():
+        portfolio_path = PortfolioManager._portfolio_root()
         descriptions = PortfolioManager.load_descriptions()
+        items = {}
+        if os.path.exists(portfolio_path):
+            for item_dir in os.listdir(portfolio_path): 
+                item = PortfolioManager._scan_portfolio_folder(item_dir, descriptions)
+                if item:
+                    items[item_dir] = item
+        PortfolioManager._index_items = items
+        PortfolioManager._search.rebuild(items)
+        PortfolioManager._index_resort()
+        PortfolioManager.save_hash_manifest()
+
+    @staticmethod
+    def invalidate_index():
+        """Force the next read to rebuild the index (e.g. after an explicit pull)."""
+        with PortfolioManager._index_lock:
+            PortfolioManager._index_signature = None
+
+    @staticmethod
+    def _index_refresh_folder(folder_name: str):
+        """Re-scan a single folder after a local mutation instead of rebuilding everything."""
+        with PortfolioManager._index_lock:
+            if PortfolioManager._index_signature is None:
+                return # Index not built yet; the next read builds it from scratch.
+            description = PortfolioManager.DESCRIPTIONS.get(folder_name)
+            item = PortfolioManager._scan_portfolio_folder(folder_name, {folder_name: description} if description else {})
+            if item:
+                PortfolioManager._index_items[folder_name] = item
+            else:
+                PortfolioManager._index_items.pop(folder_name, None)
+            PortfolioManager._search.update(folder_name, item)
+            PortfolioManager._index_resort()
+            signature = PortfolioManager._index_current_signature()
+            # If another worker bumped the stamp since our own write, rebuild on the next read.
+            PortfolioManager._index_signature = signature if signature[-1] == PortfolioManager._stamp_seen else None
+            PortfolioManager.save_hash_manifest()
+
+    @staticmethod
+    def _ensure_index():
+        """Rebuild the index if the on-disk signature changed. Caller holds _index_lock."""
+        portfolio_path = PortfolioManager._portfolio_root()
+        if not os.path.isdir(PortfolioManager.BASE_DIR):
+            # Not cloned yet (the startup clone runs in the background): list nothing, and do
+            # not create the directory, which would block the clone. Check again on the next read.
+            if not PortfolioManager._index_orders or PortfolioManager._index_items:
+                PortfolioManager._rebuild_index()
+            PortfolioManager._index_signature = None
+            return
         if not os.path.exists(portfolio_path):
             os.makedirs(portfolio_path, exist_ok=True)
-            return items
-        temp_items = []
-        for item_dir in os.listdir(portfolio_path): 
-            dir_path = os.path.join(portfolio_path, item_dir)
-            if not os.path.isdir(dir_path) or not item_dir.startswith('w'):
-                continue
+        signature = PortfolioManager._index_current_signature()
+        if signature != PortfolioManager._index_signature:
+            PortfolioManager._rebuild_index()
+            PortfolioManager._index_signature = signature
+            PortfolioManager._stamp_seen = signature[-1]
+
+    @staticmethod
+    def get_portfolio_items() -> List[Dict]:
+        with PortfolioManager._index_lock:
+            PortfolioManager._ensure_index()
+            return list(PortfolioManager._index_sorted)
+
+    @staticmethod
+    def listing_digest() -> str:
+        """Content digest of the current listing; changes whenever any item changes."""
+        with PortfolioManager._index_lock:
+            PortfolioManager._ensure_index()
+            return PortfolioManager._index_digest
+
+    @staticmethod
+    def get_portfolio_item(folder_name: str) -> Optional[Dict]:
+        """Full item (with every image) for one folder, or None."""
+        with PortfolioManager._index_lock:
+            PortfolioManager._ensure_index()
+            return PortfolioManager._index_items.get(folder_name)
+
+    @staticmethod
+    def query_portfolio_items(type: str = None, area: str = None, date_from: str = None, date_to: str = None,
+                              sort: str = '-folder_num', offset: int = 0, limit: int = None, cursor: str = None,
+                              q: str = None, facets: bool = False, view: str = 'full') -> Dict:
+        """Filtered, sorted page of the listing served from the secondary indexes.
+        `cursor` is the folder of the last item of the previous page and takes precedence over offset.
+        view='summary' lists each item's cover and image_count instead of its images.
+        `q` is a full-text query (see SearchIndex). With `facets`, the result also counts the
+        matches per 區域 and 種類, each counted with every filter except its own."""
+        descending = sort.startswith('-')
+        key = sort.lstrip('-')
+        if key not in PortfolioManager.SORT_KEYS:
+            raise ValueError(f"不支援的排序欄位: {key}")
+        if view not in PortfolioManager.VIEWS:
+            raise ValueError(f"不支援的檢視模式: {view}")
+        with PortfolioManager._index_lock:
+            PortfolioManager._ensure_index()
+            items = PortfolioManager._index_items
+            order = PortfolioManager._index_orders[key]
+            positions = PortfolioManager._index_positions[key]
+
+            allowed = PortfolioManager._search.search(q) if q else None
+            if date_from or date_to:
+                # Dates are zero-padded, so a prefix range is a slice of the date order.
+                date_order = PortfolioManager._index_date_order
+                lo = bisect_left(date_order, PortfolioManager.normalize_date(date_from) or '0')
+                hi = bisect_right(date_order, (PortfolioManager.normalize_date(date_to) or '9999') + '~')
+                in_range = set(PortfolioManager._index_orders['date'][lo:hi])
+                allowed = in_range if allowed is None else allowed & in_range
+            base = allowed
+            by_facet = {}
+            for name, value, index in (('type', type, PortfolioManager._index_by_type), ('area', area, PortfolioManager._index_by_area)):
+                if value:
+                    by_facet[name] = index.get(value, set())
+                    allowed = by_facet[name] if allowed is None else allowed & by_facet[name]
+
+            if allowed is None:
+                candidates = order[::-1] if descending else order
+            else:
+                candidates = sorted(allowed, key=positions.__getitem__, reverse=descending)
+
+            start = max(offset, 0)
+            if cursor:
+                try:
+                    start = candidates.index(cursor) + 1
+                except ValueError:
+                    raise ValueError(f"無效的 cursor: {cursor}")
+            end = start + limit if limit else len(candidates)
+            source = PortfolioManager._index_summaries if view == 'summary' else items
+            page = [source[f] for f in candidates[start:end]]
+            result = {
+                'items': page,
+                'total': len(candidates),
+                'offset': start,
+                'next_cursor': page[-1]['folder'] if page and end < len(candidates) else None,
+                'digest': PortfolioManager._index_digest,
+            }
+            if facets:
+                # Few distinct values: intersecting each value's folder set beats counting items.
+                result['facets'] = {}
+                for name, index, other in (('type', PortfolioManager._index_by_type, 'area'),
+                                           ('area', PortfolioManager._index_by_area, 'type')):
+                    matched = base
+                    if other in by_facet:
+                        matched = by_facet[other] if matched is None else matched & by_facet[other]
+                    counts = {value: len(folders) if matched is None else len(folders & matched) for value, folders in index.items()}
+                    result['facets'][name] = {value: count for value, count in sorted(counts.items(), key=lambda vc: -vc[1]) if count}
+            return result
+
+    @staticmethod
+    @contextmanager
+    def folder_lock(folder_name: str):
+        with PortfolioManager._folder_locks_guard:
+            lock = PortfolioManager._folder_locks.get(folder_name)
+            if lock is None:
+                safe_name = re.sub(r'[^A-Za-z0-9_-]', '_', folder_name)
+                lock = PortfolioManager._folder_locks[folder_name] = FileLock(
+                    os.path.join(FileLock.STATE_DIR, "folders", f"{safe_name}.lock"))
+        with lock:
+            yield
+
+    @staticmethod
+    def reserve_portfolio_folder() -> str:
+        """Atomically claim the next wN folder. os.mkdir fails if another request created
+        the same folder first, in which case the next number is tried."""
+        portfolio_path = PortfolioManager._portfolio_root()
+        os.makedirs(portfolio_path, exist_ok=True)
+        next_num = PortfolioManager.get_next_portfolio_number()
+        while True:
+            folder_name = f"w{next_num}"
             try:
-                folder_num = int(item_dir[1:])
-            except ValueError:
-                continue 
-            images = []
-            filenames_sorted = sorted(os.listdir(dir_path), key=lambda name: int(name.split('.')[0]) if name.split('.')[0].isdigit() else float('inf'))
-            for filename in filenames_sorted: 
-                filepath = os.path.join(dir_path, filename)
-                if os.path.isfile(filepath) and filename.lower().endswith('.webp'):
-                    images.append({ 'name': filename, 'path': f"/assets/img/portfolio/{item_dir}/{filename}" })
-            if images:
-                desc_data = descriptions.get(item_dir, {}) 
-                temp_items.append({
-                    'name': desc_data.get("專案名", f"作品集 {item_dir[1:]}"), 
-                    'folder': item_dir, 'folder_num': folder_num, 'images': images,
-                    'description': desc_data.get("描述", ""), 'area': desc_data.get("區域", ""),
-                    'date': desc_data.get("日期", ""), 'size': desc_data.get("坪數", ""),
-                    'type': desc_data.get("種類", "")
-                })
-        items = sorted(temp_items, key=lambda x: x['folder_num'], reverse=True)
-        return items
+                os.mkdir(os.path.join(portfolio_path, folder_name))
+                return folder_name
+            except FileExistsError:
+                next_num += 1
 
     @staticmethod
     def get_next_portfolio_number() -> int:
@@ -195,8 +937,14 @@ class PortfolioManager:
         return max_num + 1
 
     @staticmethod
-    def replace_portfolio_images(folder_name: str, uploaded_files: List) -> Tuple[bool, str]:
-        if not Image: 
+    def replace_portfolio_images(folder_name: str, uploaded_files: List, progress: Optional[Callable] = None) -> Tuple[bool, str]:
+        """progress(upload_index, ok, error) is called as each uploaded file finishes encoding."""
+        with PortfolioManager.folder_lock(folder_name):
+            return PortfolioManager._replace_portfolio_images(folder_name, uploaded_files, progress)
+
+    @staticmethod
+    def _replace_portfolio_images(folder_name: str, uploaded_files: List, progress: Optional[Callable] = None) -> Tuple[bool, str]:
+        if not PortfolioManager._pillow(): 
             return False, "錯誤: Pillow 未安装，無法處理圖片。"
         
         portfolio_path = os.path.join(PortfolioManager.BASE_DIR, PortfolioManager.PORTFOLIO_DIR, folder_name)
@@ -206,83 +954,370 @@ class PortfolioManager:
             return False, f"目標路徑並非資料夾: {portfolio_path}"
 
         try:
-            # 1. Delete existing WebP files
-            for filename in os.listdir(portfolio_path):
-                if filename.lower().endswith('.webp'):
-                    try:
-                        os.remove(os.path.join(portfolio_path, filename))
-                    except OSError as e:
-                        print(f"無法刪除檔案 {filename}: {e}")
-            
-            # 2. 判斷是否全部為編號命名的圖片（例如 0.webp、1.webp）
-            is_all_numbered = True
-            for file_storage in uploaded_files:
-                original_filename = file_storage.filename
-                if original_filename and (original_filename.lower().endswith('.jpg') or original_filename.lower().endswith('.webp')):
-                    name_part = os.path.splitext(original_filename)[0]
-                    if not name_part.isdigit():
-                        is_all_numbered = False
-                        break
-
-            # 3. 儲存圖片
-            saved_filenames = []
-            file_map = {}
-            for idx, file_storage in enumerate(uploaded_files):
-                original_filename = file_storage.filename
-                if original_filename and (original_filename.lower().endswith('.jpg') or original_filename.lower().endswith('.webp')):
-                    if is_all_numbered:
-                        # Convert to WebP format with number
-                        name_part = os.path.splitext(original_filename)[0]
-                        safe_filename = f"{name_part}.webp"
-                    else:
-                         return False, "請將圖檔以數字編號（0.webp、1.webp...）， 規則：0為平面圖，往後為實景圖。"
-
-                    file_path = os.path.join(portfolio_path, safe_filename)
-                    
-                    # Convert and save as WebP
-                    try:
-                        with Image.open(file_storage) as img:
-                            img_rgb = img.convert("RGB")
-                            img_rgb.save(file_path, format='WEBP', quality=75)
-                    except Exception as img_e:
-                        print(f"Error converting image {original_filename} to WebP: {img_e}")
-                        return False, f"轉換圖片 {original_filename} 為 WebP 格式時出錯"
-                    
-                    saved_filenames.append(safe_filename)
-                    file_map[safe_filename] = file_path
+            # 1. 讀取上傳內容 (全部須為編號命名，例如 0.webp、1.webp)
+            with PortfolioManager._collect_sources(uploaded_files) as (sources, saved_filenames, error):
+                if error:
+                    return False, error
+                if not saved_filenames:
+                    return False, "無有效圖片檔案上傳，無法替換圖片"
 
-            if not saved_filenames:
-                return False, "無有效圖片檔案上傳，無法替換圖片"
-
-            # 4. Process 0.webp if 0.webp and 1.webp exist
-            path_0 = file_map.get("0.webp")
-            path_1 = file_map.get("1.webp")
-            processing_done = False
-            if path_0 and path_1:
-                try:
-                    with Image.open(path_0) as img_0, Image.open(path_1) as img_1:
-                        canvas_size = img_1.size
-                        processed_img_0 = PortfolioManager._resize_and_center_image(img_0, canvas_size)
-                        if processed_img_0: 
-                            processed_img_0.save(path_0, format='WEBP', quality=75)
-                            processing_done = True
-                except Exception as img_proc_e:
-                    print(f"Error processing replaced image {path_0}: {img_proc_e}. Keeping original.")
-            
-            return True, f"圖片上傳成功"
+                # 2. 0.webp (平面圖) is fitted onto the canvas size of 1.webp. The size is read
+                # from the 1.webp header, so the floor plan can be encoded in the same batch.
+                # Files that are re-uploaded unchanged are left alone by _write_images.
+                canvas_size = PortfolioManager._floor_plan_canvas(sources, None)
+                success, message = PortfolioManager._write_images(folder_name, portfolio_path, saved_filenames, sources, canvas_size, progress)
+                if success:
+                    # 3. Only now remove WebP files that are not part of the new set and stage
+                    # the folder; a failed replace keeps the old images and is not pushed.
+                    stale = [f for f in os.listdir(portfolio_path) if f.lower().endswith('.webp') and f not in sources]
+                    PortfolioManager._remove_images(folder_name, portfolio_path, stale)
+                    PortfolioManager._mark_changed(folder_name)
+            PortfolioManager._index_refresh_folder(folder_name)
+            return success, message
 
         except Exception as e:
             print(f"替換作品 {folder_name} 圖片時出錯: {e}")
             return False, f"替換圖片時出現錯誤: {e}"
 
+    # --- Incremental image updates ---
+    # Per folder: WebP filename -> {"source": sha256 of the upload, "canvas": [w, h] or None,
+    # "mtime_ns", "size"} of the file we wrote. An upload with the same source and canvas,
+    # whose WebP is untouched since, is not re-encoded, so unchanged images stay
+    # byte-identical and git only transfers real changes.
+    SOURCE_MANIFEST_DIR = os.path.join(FileLock.STATE_DIR, "sources")
+
+    @staticmethod
+    def _source_manifest_path(folder_name: str) -> str:
+        return os.path.join(PortfolioManager.SOURCE_MANIFEST_DIR, f"{re.sub(r'[^A-Za-z0-9_-]', '_', folder_name)}.json")
+
     @staticmethod
-    def create_new_portfolio(uploaded_files: List, description_data: Dict) -> Tuple[bool, str]:
-        folder_name = ""
+    def _load_source_manifest(folder_name: str) -> Dict[str, Dict]:
         try:
-            next_num = PortfolioManager.get_next_portfolio_number()
-            folder_name = f"w{next_num}"
-            
-            save_success, save_message = PortfolioManager.replace_portfolio_images(folder_name, uploaded_files)
+            with open(PortfolioManager._source_manifest_path(folder_name), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            return manifest if isinstance(manifest, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _save_source_manifest(folder_name: str, manifest: Dict[str, Dict]):
+        path = PortfolioManager._source_manifest_path(folder_name)
+        try:
+            if not manifest:
+                if os.path.exists(path):
+                    os.remove(path)
+                return
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"無法寫入圖片來源紀錄 {path}: {e}")
+
+    @staticmethod
+    def _image_number(filename: str) -> Optional[int]:
+        name_part = os.path.splitext(filename)[0]
+        return int(name_part) if filename.lower().endswith('.webp') and name_part.isdigit() else None
+
+    @staticmethod
+    def _source_path(file_storage, spool_dir: str, idx: int) -> str:
+        """Path of the upload's content on disk. Spooled uploads already have one; others are
+        streamed to a file in spool_dir, so no upload is held in memory as a whole."""
+        path = getattr(file_storage, 'path', None)
+        if path:
+            return os.path.abspath(path)
+        path = os.path.join(spool_dir, f"{idx}.upload")
+        stream = getattr(file_storage, 'stream', None)
+        with open(path, 'wb') as f:
+            if stream is not None:
+                shutil.copyfileobj(stream, f, PortfolioManager.COPY_CHUNK_BYTES)
+            else:
+                f.write(file_storage.read())
+        return path
+
+    @staticmethod
+    @contextmanager
+    def _collect_sources(uploaded_files: List, first_free: Optional[int] = None):
+        """Yield uploads as {safe_filename: (original_filename, source_path, upload_index)}.
+        Numbered uploads (0.jpg, 1.webp...) keep their number. Unnumbered ones are an error,
+        unless first_free is given, in which case they are numbered from there in upload order.
+        Yields (sources, filenames in first-seen order, error message or None); files written
+        for uploads that were not already on disk are removed on exit."""
+        sources = {}
+        saved_filenames = []
+        uploads = [(idx, f) for idx, f in enumerate(uploaded_files)
+                   if f.filename and (f.filename.lower().endswith('.jpg') or f.filename.lower().endswith('.webp'))]
+        if first_free is None and any(not os.path.splitext(f.filename)[0].isdigit() for _, f in uploads):
+            yield {}, [], "請將圖檔以數字編號（0.webp、1.webp...）， 規則：0為平面圖，往後為實景圖。"
+            return
+        spool_dir = tempfile.mkdtemp(prefix="upload-")
+        try:
+            next_num = first_free
+            for idx, file_storage in uploads:
+                name_part = os.path.splitext(file_storage.filename)[0]
+                if name_part.isdigit():
+                    safe_filename = f"{name_part}.webp"
+                else:
+                    while f"{next_num}.webp" in sources:
+                        next_num += 1
+                    safe_filename = f"{next_num}.webp"
+                    next_num += 1
+                if safe_filename not in sources:
+                    saved_filenames.append(safe_filename)
+                # Later duplicates win, as before
+                sources[safe_filename] = (file_storage.filename, PortfolioManager._source_path(file_storage, spool_dir, idx), idx)
+            yield sources, saved_filenames, None
+        finally:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+    @staticmethod
+    def _file_sha256(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(PortfolioManager.COPY_CHUNK_BYTES), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _floor_plan_canvas(sources: Dict, portfolio_path: Optional[str]):
+        """Canvas for 0.webp: the size of the uploaded 1.webp, or of the one on disk if
+        portfolio_path is given and 1.webp is not being uploaded."""
+        if "0.webp" not in sources:
+            return None
+        try:
+            if "1.webp" in sources:
+                with Image.open(sources["1.webp"][1]) as img_1:
+                    return PortfolioManager._bounded_size(img_1.size)
+            if portfolio_path and os.path.isfile(os.path.join(portfolio_path, "1.webp")):
+                with Image.open(os.path.join(portfolio_path, "1.webp")) as img_1:
+                    return img_1.size
+        except Exception as img_proc_e:
+            print(f"Error reading canvas size from 1.webp: {img_proc_e}. Keeping original 0.webp.")
+        return None
+
+    @staticmethod
+    def _write_images(folder_name: str, portfolio_path: str, saved_filenames: List[str], sources: Dict,
+                      canvas_size, progress: Optional[Callable] = None) -> Tuple[bool, str]:
+        """Encode the given uploads, skipping those whose source hash matches what produced
+        the WebP currently on disk. progress(upload_index, ok, error) is called for each."""
+        manifest = PortfolioManager._load_source_manifest(folder_name)
+        encoding = PortfolioManager._encoding_key()
+        jobs, job_names, skipped = [], [], 0
+        for safe_filename in saved_filenames:
+            original_filename, source_path, idx = sources[safe_filename]
+            canvas = list(canvas_size) if canvas_size and safe_filename == "0.webp" else None
+            source_hash = PortfolioManager._file_sha256(source_path)
+            record = manifest.get(safe_filename)
+            file_path = os.path.abspath(os.path.join(portfolio_path, safe_filename)) # workers may not share our cwd
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                st = None
+            if (record and st and record.get('source') == source_hash and record.get('canvas') == canvas
+                    and record.get('encoding', 'webp:q75') == encoding
+                    and record.get('mtime_ns') == st.st_mtime_ns and record.get('size') == st.st_size):
+                skipped += 1
+                if progress:
+                    progress(idx, True, "")
+                continue
+            manifest[safe_filename] = {'source': source_hash, 'canvas': canvas, 'encoding': encoding}
+            jobs.append((source_path, file_path, tuple(canvas) if canvas else None))
+            job_names.append(safe_filename)
+
+        job_progress = None
+        if progress:
+            job_progress = lambda i, ok, err: progress(sources[job_names[i]][2], ok, err)
+        error = None
+        bytes_in = bytes_out = avif_bytes = 0
+        for safe_filename, (ok, err, stats) in zip(job_names, PortfolioManager._run_image_jobs(jobs, job_progress)):
+            if ok:
+                bytes_in += stats.get('bytes_in', 0)
+                bytes_out += stats.get('bytes_out', 0)
+                avif_bytes += stats.get('avif_bytes', 0)
+            record = manifest[safe_filename]
+            st = os.stat(os.path.join(portfolio_path, safe_filename)) if ok else None
+            if not st:
+                manifest.pop(safe_filename, None)
+            else:
+                record['mtime_ns'], record['size'] = st.st_mtime_ns, st.st_size
+            if not ok and error is None:
+                original_filename = sources[safe_filename][0]
+                print(f"Error converting image {original_filename} to WebP: {err}")
+                error = f"轉換圖片 {original_filename} 為 WebP 格式時出錯"
+        PortfolioManager._save_source_manifest(folder_name, manifest)
+        if error:
+            return False, error
+        notes = []
+        if jobs:
+            notes.append(PortfolioManager._savings_note(len(jobs), bytes_in, bytes_out, avif_bytes))
+        if skipped:
+            notes.append(f"{skipped} 張圖片未變更，已略過")
+        return True, f"圖片上傳成功 ({'；'.join(notes)})" if notes else "圖片上傳成功"
+
+    @staticmethod
+    def _savings_note(count: int, bytes_in: int, bytes_out: int, avif_bytes: int = 0) -> str:
+        mb = lambda n: f"{n / (1024 * 1024):.2f} MB"
+        note = f"共 {count} 張：{mb(bytes_in)} → {mb(bytes_out)}"
+        if bytes_out < bytes_in:
+            note += f"，節省 {(1 - bytes_out / bytes_in) * 100:.0f}%"
+        if avif_bytes:
+            note += f"，AVIF {mb(avif_bytes)}"
+        return note
+
+    @staticmethod
+    def _remove_images(folder_name: str, portfolio_path: str, filenames: List[str]):
+        if not filenames:
+            return
+        manifest = PortfolioManager._load_source_manifest(folder_name)
+        for filename in filenames:
+            try:
+                os.remove(os.path.join(portfolio_path, filename))
+            except OSError as e:
+                print(f"無法刪除檔案 {filename}: {e}")
+            try:
+                os.remove(os.path.join(portfolio_path, PortfolioManager._avif_sibling(filename)))
+            except OSError:
+                pass
+            for size_name in PortfolioManager.DERIVATIVE_SIZES:
+                try:
+                    os.remove(PortfolioManager._derivative_path(size_name, folder_name, filename))
+                except OSError:
+                    pass
+            manifest.pop(filename, None)
+        PortfolioManager._save_source_manifest(folder_name, manifest)
+
+    @staticmethod
+    def _renumber_images(folder_name: str, portfolio_path: str, mapping: Dict[str, str]):
+        """Rename WebP files (and their AVIF siblings, derivatives and source records) old -> new
+        in two phases, so swapping names never overwrites a file. Renames keep the bytes, so git
+        records them as renames without new objects."""
+        mapping = {old: new for old, new in mapping.items() if old != new}
+        if not mapping:
+            return
+        manifest = PortfolioManager._load_source_manifest(folder_name)
+        directories = [portfolio_path] + [os.path.join(PortfolioManager.DERIVATIVE_DIR, size_name, folder_name)
+                                          for size_name in PortfolioManager.DERIVATIVE_SIZES]
+        with_siblings = dict(mapping)
+        with_siblings.update({PortfolioManager._avif_sibling(old): PortfolioManager._avif_sibling(new)
+                              for old, new in mapping.items()})
+        for directory in directories:
+            moved = []
+            for old in (with_siblings if directory == portfolio_path else mapping):
+                try:
+                    os.rename(os.path.join(directory, old), os.path.join(directory, f".{old}.renumber"))
+                    moved.append(old)
+                except OSError:
+                    pass # derivative not generated yet
+            for old in moved:
+                os.rename(os.path.join(directory, f".{old}.renumber"), os.path.join(directory, with_siblings[old]))
+        records = {old: manifest.pop(old) for old in mapping if old in manifest}
+        for old, record in records.items():
+            manifest[mapping[old]] = record
+        PortfolioManager._save_source_manifest(folder_name, manifest)
+
+    @staticmethod
+    def _photo_names(portfolio_path: str) -> List[str]:
+        """Numbered photos (1.webp, 2.webp...) in display order; 0.webp is the floor plan."""
+        numbered = [(PortfolioManager._image_number(f), f) for f in os.listdir(portfolio_path)]
+        return [f for num, f in sorted(n for n in numbered if n[0] is not None) if num >= 1]
+
+    @staticmethod
+    def _existing_folder_path(folder_name: str) -> Optional[str]:
+        if not folder_name or not folder_name.startswith('w') or not folder_name[1:].isdigit():
+            return None
+        portfolio_path = os.path.join(PortfolioManager._portfolio_root(), folder_name)
+        return portfolio_path if os.path.isdir(portfolio_path) else None
+
+    @staticmethod
+    def add_portfolio_images(folder_name: str, uploaded_files: List, progress: Optional[Callable] = None) -> Tuple[bool, str]:
+        """Add images to an existing project without touching the others. Numbered uploads
+        replace the image with that number (unless unchanged); unnumbered ones are appended."""
+        with PortfolioManager.folder_lock(folder_name):
+            if not PortfolioManager._pillow():
+                return False, "錯誤: Pillow 未安装，無法處理圖片。"
+            portfolio_path = PortfolioManager._existing_folder_path(folder_name)
+            if not portfolio_path:
+                return False, f"作品資料夾 {folder_name} 不存在"
+            try:
+                photos = PortfolioManager._photo_names(portfolio_path)
+                first_free = (PortfolioManager._image_number(photos[-1]) + 1) if photos else 1
+                with PortfolioManager._collect_sources(uploaded_files, first_free) as (sources, saved_filenames, _):
+                    if not saved_filenames:
+                        return False, "無有效圖片檔案上傳"
+                    canvas_size = PortfolioManager._floor_plan_canvas(sources, portfolio_path)
+                    success, message = PortfolioManager._write_images(folder_name, portfolio_path, saved_filenames, sources, canvas_size, progress)
+                if success:
+                    PortfolioManager._mark_changed(folder_name)
+                PortfolioManager._index_refresh_folder(folder_name)
+                return success, message
+            except Exception as e:
+                print(f"新增作品 {folder_name} 圖片時出錯: {e}")
+                return False, f"新增圖片時出現錯誤: {e}"
+
+    @staticmethod
+    def remove_portfolio_images(folder_name: str, filenames: List[str]) -> Tuple[bool, str]:
+        """Delete the given images; the remaining photos are renumbered 1..N in their current order."""
+        with PortfolioManager.folder_lock(folder_name):
+            portfolio_path = PortfolioManager._existing_folder_path(folder_name)
+            if not portfolio_path:
+                return False, f"作品資料夾 {folder_name} 不存在"
+            current = [f for f in os.listdir(portfolio_path) if f.lower().endswith('.webp')]
+            unknown = [f for f in filenames if f not in current]
+            if unknown:
+                return False, f"找不到圖片: {', '.join(unknown)}"
+            if not set(current) - set(filenames):
+                return False, "至少需保留一張圖片，如要移除整個作品請使用刪除功能"
+            try:
+                PortfolioManager._remove_images(folder_name, portfolio_path, list(set(filenames)))
+                remaining = PortfolioManager._photo_names(portfolio_path)
+                PortfolioManager._renumber_images(folder_name, portfolio_path,
+                                                  {old: f"{num}.webp" for num, old in enumerate(remaining, start=1)})
+                PortfolioManager._mark_changed(folder_name)
+                PortfolioManager._index_refresh_folder(folder_name)
+                return True, f"已移除 {len(set(filenames))} 張圖片"
+            except Exception as e:
+                print(f"移除作品 {folder_name} 圖片時出錯: {e}")
+                return False, f"移除圖片時出現錯誤: {e}"
+
+    @staticmethod
+    def reorder_portfolio_images(folder_name: str, order: List[str]) -> Tuple[bool, str]:
+        """Renumber the photos 1..N in the given order (a permutation of the current photos).
+        The floor plan 0.webp keeps its place."""
+        with PortfolioManager.folder_lock(folder_name):
+            portfolio_path = PortfolioManager._existing_folder_path(folder_name)
+            if not portfolio_path:
+                return False, f"作品資料夾 {folder_name} 不存在"
+            photos = PortfolioManager._photo_names(portfolio_path)
+            if sorted(order) != sorted(photos):
+                return False, f"排序必須包含所有實景圖且不可重複: {', '.join(photos)}"
+            try:
+                PortfolioManager._renumber_images(folder_name, portfolio_path,
+                                                  {old: f"{num}.webp" for num, old in enumerate(order, start=1)})
+                PortfolioManager._mark_changed(folder_name)
+                PortfolioManager._index_refresh_folder(folder_name)
+                return True, "已更新圖片順序"
+            except Exception as e:
+                print(f"調整作品 {folder_name} 圖片順序時出錯: {e}")
+                return False, f"調整圖片順序時出現錯誤: {e}"
+
+    @staticmethod
+    def create_new_portfolio(uploaded_files: List, description_data: Dict, folder_name: str = None,
+                             progress: Optional[Callable] = None) -> Tuple[bool, str]:
+        """Create a project in `folder_name` (from reserve_portfolio_folder) or a newly reserved folder."""
+        if not folder_name:
+            try:
+                folder_name = PortfolioManager.reserve_portfolio_folder()
+            except Exception as e:
+                return False, f"建立作品集《{description_data['project_name']} 》時出現錯誤: {e}"
+        with PortfolioManager.folder_lock(folder_name):
+            return PortfolioManager._create_in_folder(folder_name, uploaded_files, description_data, progress)
+
+    @staticmethod
+    def _create_in_folder(folder_name: str, uploaded_files: List, description_data: Dict,
+                          progress: Optional[Callable] = None) -> Tuple[bool, str]:
+        try:
+            save_success, save_message = PortfolioManager.replace_portfolio_images(folder_name, uploaded_files, progress)
 
             if not save_success:
                  if os.path.exists(os.path.join(PortfolioManager.BASE_DIR, PortfolioManager.PORTFOLIO_DIR, folder_name)):
@@ -303,52 +1338,51 @@ class PortfolioManager:
                      print(f"Error during cleanup of folder {folder_name}: {cleanup_e}")
             return False, f"建立作品集《{description_data['project_name']} 》時出現錯誤: {e}"
 
-
     @staticmethod
     def delete_portfolio(folder_name: str) -> Tuple[bool, str]:
-        delete_folder_success = False
-        delete_desc_success = False
-        folder_message = ""
-        desc_message = ""
+        with PortfolioManager.folder_lock(folder_name):
+            return PortfolioManager._delete_portfolio(folder_name)
+
+    @staticmethod
+    def _delete_folder_files(folder_name: str) -> Tuple[bool, str]:
+        """Remove the folder's images, derivatives and source records (not its description)."""
         try:
             if not folder_name or not folder_name.startswith('w') or not folder_name[1:].isdigit():
-                folder_message = "無效的作品資料夾名稱"
-            else:
-                portfolio_path = os.path.join(PortfolioManager.BASE_DIR, PortfolioManager.PORTFOLIO_DIR, folder_name)
-                if os.path.exists(portfolio_path) and os.path.isdir(portfolio_path):
-                    shutil.rmtree(portfolio_path)
-                    delete_folder_success = True
-                    folder_message = f"成功刪除作品"
-                    # print(f"Deleted portfolio folder: {portfolio_path}") # Removed Debug
-                else:
-                    folder_message = f"作品資料夾 {folder_name} 不存在"
+                return False, "無效的作品資料夾名稱"
+            portfolio_path = os.path.join(PortfolioManager.BASE_DIR, PortfolioManager.PORTFOLIO_DIR, folder_name)
+            if os.path.exists(portfolio_path) and os.path.isdir(portfolio_path):
+                shutil.rmtree(portfolio_path)
+                PortfolioManager._remove_derivatives(folder_name)
+                PortfolioManager._save_source_manifest(folder_name, {})
+                return True, f"成功刪除作品"
+            return False, f"作品資料夾 {folder_name} 不存在"
         except Exception as e:
-            folder_message = f"删除資料夾 {folder_name} 時出錯: {e}"
             print(f"Error deleting portfolio folder {folder_name}: {e}")
+            return False, f"删除資料夾 {folder_name} 時出錯: {e}"
+
+    @staticmethod
+    def _delete_portfolio(folder_name: str) -> Tuple[bool, str]:
+        delete_desc_success = False
+        desc_message = ""
+        delete_folder_success, folder_message = PortfolioManager._delete_folder_files(folder_name)
         try:
-            entries = []
-            if os.path.exists(PortfolioManager.DESCRIPTION_FILE):
-                with open(PortfolioManager.DESCRIPTION_FILE, 'r', encoding='utf-8') as f:
-                    entries = json.load(f)
-                if isinstance(entries, list):
-                    original_length = len(entries)
-                    entries = [entry for entry in entries if entry.get("圖片連結", "").strip('/').split('/')[-1] != folder_name]
-                    if len(entries) < original_length:
-                        with open(PortfolioManager.DESCRIPTION_FILE, 'w', encoding='utf-8') as f:
-                            json.dump(entries, f, ensure_ascii=False, indent=4)
-                        delete_desc_success = True
-                        # desc_message = f"成功從作品描述json檔案中移除 {folder_name}"
-                        desc_message = f""
-                        # print(f"Removed description for {folder_name}") # Removed Debug
-                    else:
-                        desc_message = f"作品描述json檔案中未找到 {folder_name}"
-                else:
+            store = PortfolioManager.DESCRIPTIONS
+            with store.lock:
+                if store.delete(folder_name):
+                    delete_desc_success = True
+                    desc_message = f""
+                elif store.load_error == "missing":
+                    desc_message = "作品描述json檔案不存在，無需刪除項目"
+                elif store.load_error == "not_list":
                     desc_message = "作品描述json檔案格式非陣列，無法刪除該項目"
-            else:
-                desc_message = "作品描述json檔案不存在，無需刪除項目"
+                else:
+                    desc_message = f"作品描述json檔案中未找到 {folder_name}"
         except Exception as e:
             desc_message = f"删除描述項目 {folder_name} 時出錯: {e}"
             print(f"Error deleting description entry {folder_name}: {e}")
+        if delete_folder_success or delete_desc_success:
+            PortfolioManager._mark_changed(folder_name if delete_folder_success else None, description=delete_desc_success)
+            PortfolioManager._index_refresh_folder(folder_name)
         final_success = delete_folder_success 
         final_message = f"{folder_message}. {desc_message}."
         return final_success, final_message
\ No newline at end of file
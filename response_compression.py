@@ -0,0 +1,102 @@
+import gzip
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from metrics import Metrics
+
+class ResponseCompression:
+    """Compresses JSON responses with brotli or gzip, whichever the client prefers
+    (brotli only when the `brotli` package is installed). Bodies under MIN_BYTES are sent as is.
+
+    A compressed response's ETag is made weak (the bytes differ from the uncompressed
+    representation), so routes compare If-None-Match with contains_weak. Responses that
+    carry an ETag are also kept compressed in a small LRU keyed by URL, ETag and encoding:
+    a route can return cached() before building its JSON, so repeated list requests skip
+    serialization and compression."""
+    MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+    GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', '6'))
+    BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', '5'))
+    CACHE_ENTRIES = 64
+    MIMETYPES = ('application/json',)
+
+    _cache: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+    _cache_lock = threading.Lock()
+
+    @staticmethod
+    def encodings() -> Tuple[str, ...]:
+        return ('br', 'gzip') if brotli else ('gzip',)
+
+    @staticmethod
+    def choose() -> Optional[str]:
+        """Best encoding the current request accepts, or None."""
+        best, best_quality = None, 0
+        for encoding in ResponseCompression.encodings():
+            quality = request.accept_encodings[encoding]
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    @staticmethod
+    def compress(data: bytes, encoding: str) -> bytes:
+        if encoding == 'br':
+            return brotli.compress(data, quality=ResponseCompression.BROTLI_QUALITY)
+        return gzip.compress(data, compresslevel=ResponseCompression.GZIP_LEVEL, mtime=0)
+
+    @staticmethod
+    def cached(etag: str) -> Optional[Response]:
+        """The compressed response stored for this URL and ETag, if any."""
+        encoding = ResponseCompression.choose()
+        if not encoding:
+            return None
+        key = (request.full_path, etag, encoding)
+        with ResponseCompression._cache_lock:
+            body = ResponseCompression._cache.get(key)
+            if body is None:
+                return None
+            ResponseCompression._cache.move_to_end(key)
+        response = Response(body, mimetype='application/json')
+        response.vary.add('Accept-Encoding')
+        ResponseCompression._finish(response, encoding, etag)
+        response.cache_control.no_cache = True
+        return response
+
+    @staticmethod
+    def apply(response: Response) -> Response:
+        """after_request hook: compress an eligible response in place."""
+        if (response.direct_passthrough or response.status_code != 200
+                or 'Content-Encoding' in response.headers or response.mimetype not in ResponseCompression.MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = ResponseCompression.choose()
+        if not encoding:
+            return response
+        data = response.get_data()
+        if len(data) < ResponseCompression.MIN_BYTES:
+            return response
+        body = ResponseCompression.compress(data, encoding)
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            with ResponseCompression._cache_lock:
+                ResponseCompression._cache[(request.full_path, etag, encoding)] = body
+                while len(ResponseCompression._cache) > ResponseCompression.CACHE_ENTRIES:
+                    ResponseCompression._cache.popitem(last=False)
+        Metrics.inc('portfolio_response_bytes_total', {'encoding': 'identity'}, len(data))
+        Metrics.inc('portfolio_response_bytes_total', {'encoding': encoding}, len(body))
+        response.set_data(body)
+        ResponseCompression._finish(response, encoding, etag)
+        return response
+
+    @staticmethod
+    def _finish(response: Response, encoding: str, etag: Optional[str]):
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            response.set_etag(etag, weak=True)
@@ -0,0 +1,98 @@
+import operator
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set
+
+class SearchIndex:
+    """In-memory inverted index over the text fields of portfolio items.
+
+    Chinese has no word boundaries, so text is indexed by character: every run of word
+    characters contributes its single characters and its bigrams. A query term of one
+    character is looked up directly; a longer term intersects the postings of its bigrams
+    and the candidates are confirmed with a substring check, so "住宅設計" does not match
+    "住宅" + "宅設" + "設計" scattered over a description. Terms separated by spaces are
+    ANDed. Matching is case- and width-insensitive (NFKC + lowercase).
+
+    Not thread-safe by itself: PortfolioManager calls it under its index lock."""
+    FIELDS = ('name', 'description', 'area', 'type')
+    _WORD = re.compile(r'\w+')
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+        self._text: Dict[str, str] = {}   # folder -> normalized text, for the substring check
+        self._grams: Dict[str, Set[str]] = {}  # folder -> its grams, to remove it again
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return unicodedata.normalize('NFKC', text or '').lower()
+
+    @staticmethod
+    def _grams_of(runs: Iterable[str]) -> Set[str]:
+        grams = set()
+        for run in runs:
+            grams.update(run)
+            grams.update(map(operator.add, run, run[1:]))
+        return grams
+
+    def rebuild(self, items: Dict[str, Dict]):
+        """Index exactly `items`. Folders whose text is unchanged keep their postings, so the
+        rebuild after a pull only re-indexes what the pull changed."""
+        for folder in set(self._text) - set(items):
+            self.update(folder, None)
+        for folder, item in items.items():
+            text = self._text_of(item)
+            if self._text.get(folder) != text:
+                self.update(folder, item, text)
+
+    def _text_of(self, item: Dict) -> str:
+        return "\n".join(self.normalize(str(item.get(field) or '')) for field in self.FIELDS)
+
+    def update(self, folder: str, item: Optional[Dict], text: Optional[str] = None):
+        """(Re)index one folder; item None removes it."""
+        for gram in self._grams.pop(folder, ()):
+            folders = self._postings.get(gram)
+            if folders is not None:
+                folders.discard(folder)
+                if not folders:
+                    del self._postings[gram]
+        self._text.pop(folder, None)
+        if item is None:
+            return
+        text = self._text_of(item) if text is None else text
+        grams = self._grams_of(self._WORD.findall(text))
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(folder)
+        self._text[folder] = text
+        self._grams[folder] = grams
+
+    def search(self, query: str) -> Set[str]:
+        """Folders matching every term of the query (all folders for an empty query)."""
+        terms = self._WORD.findall(self.normalize(query))
+        if not terms:
+            return set(self._text)
+        matched: Optional[Set[str]] = None
+        # Rarest terms first keeps the intersections small; the substring check runs last,
+        # on the folders that survive every term.
+        for term in sorted(terms, key=self._candidates_size):
+            candidates = self._candidates(term)
+            matched = candidates if matched is None else matched & candidates
+            if not matched:
+                return set()
+        texts = self._text
+        for term in terms:
+            if len(term) > 2:
+                matched = {folder for folder in matched if term in texts[folder]}
+        return matched
+
+    def _term_grams(self, term: str) -> List[str]:
+        return [term] if len(term) == 1 else [term[i:i + 2] for i in range(len(term) - 1)]
+
+    def _candidates_size(self, term: str) -> int:
+        return min(len(self._postings.get(gram, ())) for gram in self._term_grams(term))
+
+    def _candidates(self, term: str) -> Set[str]:
+        postings = sorted((self._postings.get(gram, set()) for gram in self._term_grams(term)), key=len)
+        candidates = set(postings[0])
+        for folders in postings[1:]:
+            candidates &= folders
+        return candidates
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from metrics import Metrics
+
+class Startup:
+    """Brings a worker to ready in the background, so the server binds its port at once.
+    The phases (imports, clone, index) are timed and reported at /readyz and /metrics.
+
+    Ready means the clone is present and the portfolio index is built. Until then
+    /readyz answers 503 and routes that modify the repository are refused."""
+    CLONE_RETRY_MAX = 300
+
+    _started = time.time()
+    _phases: Dict[str, float] = {}
+    _ready = threading.Event()
+    _thread = None
+    _start_lock = threading.Lock()
+    _message = "starting"
+
+    @staticmethod
+    @contextmanager
+    def phase(name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            Startup.record(name, time.perf_counter() - start)
+
+    @staticmethod
+    def record(name: str, seconds: float):
+        Startup._phases[name] = round(seconds, 3)
+        Metrics.set('portfolio_startup_phase_seconds', seconds, {'phase': name})
+
+    @staticmethod
+    def imports_done():
+        """Called once the app module is loaded: time spent importing it."""
+        Startup.record('imports', time.time() - Startup._started)
+
+    @staticmethod
+    def start():
+        with Startup._start_lock:
+            if Startup._thread and Startup._thread.is_alive():
+                return
+            Startup._thread = threading.Thread(target=Startup._run, name="startup", daemon=True)
+            Startup._thread.start()
+
+    @staticmethod
+    def is_ready() -> bool:
+        return Startup._ready.is_set()
+
+    @staticmethod
+    def status() -> Dict:
+        return {
+            'ready': Startup.is_ready(),
+            'message': Startup._message,
+            'phases': dict(Startup._phases),
+            'uptime': round(time.time() - Startup._started, 3),
+        }
+
+    @staticmethod
+    def _run():
+        # Imported here so Startup._started is taken before the app's own imports.
+        from git_operations import GitOperations
+        from git_sync import GitSync
+        from git_maintenance import GitMaintenance
+        from portfolio_manager import PortfolioManager
+
+        delay = 5
+        with Startup.phase('clone'):
+            while True:
+                with GitOperations.REPO_LOCK:
+                    if os.path.exists(GitOperations.REPO_PATH):
+                        break
+                    Startup._message = "cloning repository"
+                    print("Repository not found locally on startup, attempting to clone...")
+                    success, message = GitOperations.clone()
+                if success:
+                    print("Initial clone successful.")
+                    break
+                Startup._message = f"clone failed, retrying in {delay}s: {message.strip()}"
+                print(f"Initial clone failed: {message}")
+                time.sleep(delay)
+                delay = min(delay * 2, Startup.CLONE_RETRY_MAX)
+
+        Startup._message = "building portfolio index"
+        with Startup.phase('index'):
+            PortfolioManager.get_portfolio_items()
+        Startup._message = "ready"
+        Startup.record('total', time.time() - Startup._started)
+        Startup._ready.set()
+        print("Startup: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in Startup._phases.items()))
+        GitSync.start()
+        GitMaintenance.start()
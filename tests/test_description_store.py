@@ -0,0 +1,77 @@
+"""DescriptionStore keeps memory and portfolio_description.json in step, also when a write fails.
+
+    python -m pytest tests
+"""
+import errno
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import description_store
+from description_store import DescriptionStore
+
+
+def entry(folder, name):
+    return {"專案名": name, "圖片連結": f"assets/img/portfolio/{folder}"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "portfolio_description.json"
+    path.write_text(json.dumps([entry("w1", "one"), entry("w2", "two")], ensure_ascii=False), encoding="utf-8")
+    return DescriptionStore(str(path))
+
+
+@pytest.fixture
+def disk_full(monkeypatch):
+    def dump(*args, **kwargs):
+        raise OSError(errno.ENOSPC, "No space left on device")
+    monkeypatch.setattr(description_store.json, "dump", dump)
+
+
+def on_disk(store):
+    with open(store.path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_writes_are_saved(store):
+    store.put("w3", entry("w3", "three"))
+    assert store.update("w1", {"專案名": "uno"})
+    assert store.delete("w2")
+    assert store.apply({"w4": entry("w4", "four")}, {"w3": {"專案名": "tres"}}, ["w1"]) == {"w1": True, "w3": True}
+    assert [e["專案名"] for e in on_disk(store)] == ["tres", "four"]
+    assert [e["專案名"] for e in store.entries()] == ["tres", "four"]
+
+
+@pytest.mark.parametrize("write", [
+    lambda s: s.put("w3", entry("w3", "three")),
+    lambda s: s.put("w1", entry("w1", "replaced")),
+    lambda s: s.update("w1", {"專案名": "uno"}),
+    lambda s: s.delete("w2"),
+    lambda s: s.apply({"w3": entry("w3", "three")}, {"w1": {"專案名": "uno"}}, ["w2"]),
+])
+def test_failed_write_leaves_memory_unchanged(store, disk_full, write):
+    before = store.entries()
+    live = store.get("w1")
+    with pytest.raises(OSError):
+        write(store)
+    assert store.entries() == before
+    assert store.get("w1") == entry("w1", "one") and live == entry("w1", "one")
+    assert store.get("w3") is None
+    assert not [name for name in os.listdir(os.path.dirname(store.path)) if name.endswith(".tmp")]
+
+
+def test_next_write_does_not_save_a_failed_change(store, monkeypatch):
+    real_dump = json.dump
+    def dump(*args, **kwargs):
+        raise OSError(errno.ENOSPC, "No space left on device")
+    monkeypatch.setattr(description_store.json, "dump", dump)
+    with pytest.raises(OSError):
+        store.update("w1", {"專案名": "uno"})
+    monkeypatch.setattr(description_store.json, "dump", real_dump)
+    store.update("w2", {"專案名": "dos"})
+    assert [e["專案名"] for e in on_disk(store)] == ["one", "dos"]
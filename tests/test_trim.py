@@ -0,0 +1,90 @@
+"""PortfolioManager._trim_whitespace must give the same result as the original
+difference-from-white trim, including for content a downscaled image would lose.
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GITHUB_REPO_NAME", "test-portfolio")
+
+from PIL import Image, ImageChops, ImageDraw, ImageOps
+from portfolio_manager import PortfolioManager
+
+PortfolioManager._pillow()
+
+
+def legacy_trim(img, border=10):
+    """The original implementation, used as the reference result."""
+    img_rgb = img.convert("RGB")
+    bg = Image.new("RGB", img_rgb.size, (255, 255, 255))
+    diff = ImageChops.difference(img_rgb, bg)
+    diff = ImageChops.add(diff, diff, 2.0, -100)
+    bbox = diff.getbbox()
+    if bbox:
+        return ImageOps.expand(img_rgb.crop(bbox), border=border, fill="white")
+    return img_rgb
+
+
+def assert_same_as_legacy(img):
+    expected = legacy_trim(img)
+    actual = PortfolioManager._trim_whitespace(img)
+    assert actual.size == expected.size
+    assert ImageChops.difference(expected, actual).getbbox() is None
+
+
+def blank(width=4000, height=3000):
+    return Image.new("RGB", (width, height), (255, 255, 255))
+
+
+def test_isolated_pixels_near_corners():
+    img = blank()
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([2000, 10, 2020, 20], fill=(0, 0, 0))
+    img.putpixel((170, 180), (0, 0, 0))
+    img.putpixel((3820, 2820), (0, 0, 0))
+    assert PortfolioManager._find_content_bbox(img) == (170, 10, 3821, 2821)
+    assert_same_as_legacy(img)
+
+
+@pytest.mark.parametrize("color", [(0, 0, 0), (154, 154, 154), (255, 255, 154), (154, 255, 255)])
+def test_single_pixel_at_threshold(color):
+    img = blank()
+    img.putpixel((3999, 2999), color)
+    assert_same_as_legacy(img)
+
+
+def test_pixel_just_above_threshold_is_background():
+    img = blank()
+    img.putpixel((100, 100), (155, 155, 155))
+    assert PortfolioManager._find_content_bbox(img) is None
+    assert_same_as_legacy(img)
+
+
+@pytest.mark.parametrize("line", [
+    [(0, 1500), (3999, 1500)],      # 1px horizontal across the full width
+    [(3998, 0), (3998, 2999)],      # 1px vertical on the right edge
+    [(10, 10), (3990, 2990)],       # 1px diagonal
+    [(500, 2999), (501, 2999)],     # 2px segment on the bottom row
+])
+def test_thin_lines(line):
+    img = blank()
+    ImageDraw.Draw(img).line(line, fill=(120, 120, 120), width=1)
+    assert_same_as_legacy(img)
+
+
+def test_light_noise_is_ignored():
+    img = blank()
+    ImageDraw.Draw(img).rectangle([0, 0, 3999, 2999], fill=(250, 250, 250))
+    ImageDraw.Draw(img).rectangle([1000, 1000, 1200, 1100], outline=(20, 20, 20))
+    assert_same_as_legacy(img)
+
+
+def test_blank_and_small_images():
+    assert_same_as_legacy(blank())
+    small = blank(30, 20)
+    small.putpixel((29, 0), (0, 0, 0))
+    assert_same_as_legacy(small)
@@ -0,0 +1,241 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import BinaryIO, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from file_lock import FileLock
+from ingest_jobs import IngestJobs, SpooledUpload
+
+load_dotenv()
+
+class UploadSessionError(Exception):
+    """A request the session cannot accept. `status` is the HTTP status to answer with and
+    `session` the current session state (so a client can resume from `received`)."""
+    def __init__(self, message: str, status: int = 400, session: Optional[Dict] = None):
+        super().__init__(message)
+        self.status = status
+        self.session = session
+
+
+class UploadSessions:
+    """Resumable chunked uploads. A client creates a session declaring its files and sizes,
+    PUTs each file's bytes in chunks at explicit offsets, and finalizes it into an ingest job.
+
+    Chunks are streamed to DIR/<session_id>/<index>.upload in BLOCK_SIZE pieces, so memory
+    use does not depend on chunk or file size. Session state lives in DIR/<session_id>.json
+    (updated under a per-session file lock), so any worker process can take any chunk, and
+    an interrupted chunk keeps the bytes that arrived: GET the session to find where to resume."""
+    DIR = os.path.join(IngestJobs.SPOOL_DIR, "uploads")
+    KINDS = ('create', 'update', 'add')
+    MAX_SESSION_BYTES = int(os.getenv('UPLOAD_SESSION_MAX_MB', '1024')) * 1024 * 1024
+    MAX_FILES = int(os.getenv('UPLOAD_MAX_FILES', '200'))
+    MAX_CHUNK_BYTES = int(os.getenv('UPLOAD_CHUNK_MAX_MB', '16')) * 1024 * 1024
+    CHUNK_SIZE = 4 * 1024 * 1024 # suggested to clients
+    BLOCK_SIZE = 1024 * 1024
+    TTL_SECONDS = int(os.getenv('UPLOAD_SESSION_TTL', '86400'))
+    FIELDS = ("project_name", "description", "area", "date", "size", "type")
+
+    @staticmethod
+    def _meta_path(session_id: str) -> str:
+        return os.path.join(UploadSessions.DIR, f"{session_id}.json")
+
+    @staticmethod
+    def _data_dir(session_id: str) -> str:
+        return os.path.join(UploadSessions.DIR, session_id)
+
+    @staticmethod
+    def _lock(session_id: str) -> FileLock:
+        return FileLock(os.path.join(UploadSessions.DIR, f"{session_id}.lock"))
+
+    @staticmethod
+    def _valid_id(session_id: str) -> bool:
+        return len(session_id) == 32 and all(c in '0123456789abcdef' for c in session_id)
+
+    @staticmethod
+    def _load(session_id: str) -> Dict:
+        if not UploadSessions._valid_id(session_id):
+            raise UploadSessionError("找不到上傳工作階段", 404)
+        try:
+            with open(UploadSessions._meta_path(session_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise UploadSessionError("找不到上傳工作階段或已過期", 404)
+
+    @staticmethod
+    def _save(session: Dict):
+        session['updated'] = time.time()
+        path = UploadSessions._meta_path(session['id'])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(session, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _public(session: Dict) -> Dict:
+        received = sum(f['received'] for f in session['files'])
+        total = sum(f['size'] for f in session['files'])
+        return dict(session, received=received, total=total, chunk_size=UploadSessions.CHUNK_SIZE,
+                    files=[dict(f, index=i, complete=f['received'] == f['size']) for i, f in enumerate(session['files'])])
+
+    @staticmethod
+    def create(kind: str, files: List[Dict], folder_name: Optional[str] = None, fields: Optional[Dict] = None) -> Dict:
+        """files: [{'name': '1.jpg', 'size': bytes}, ...] in upload order."""
+        if kind not in UploadSessions.KINDS:
+            raise UploadSessionError(f"不支援的上傳類型: {kind}")
+        if kind != 'create' and not folder_name:
+            raise UploadSessionError("缺少作品集資料夾名稱 (folder_name)")
+        if not files:
+            raise UploadSessionError("沒有選擇任何檔案")
+        if len(files) > UploadSessions.MAX_FILES:
+            raise UploadSessionError(f"一次最多上傳 {UploadSessions.MAX_FILES} 個檔案")
+        entries = []
+        for f in files:
+            name, size = os.path.basename(str(f.get('name') or '')), f.get('size')
+            if not (name.lower().endswith('.jpg') or name.lower().endswith('.webp')):
+                raise UploadSessionError(f"只接受JPG或WebP圖片: {name}")
+            if not isinstance(size, int) or size <= 0:
+                raise UploadSessionError(f"檔案大小無效: {name}")
+            entries.append({'name': name, 'size': size, 'received': 0})
+        total = sum(e['size'] for e in entries)
+        if total > UploadSessions.MAX_SESSION_BYTES:
+            raise UploadSessionError(f"上傳總大小超過上限 {UploadSessions.MAX_SESSION_BYTES // (1024 * 1024)} MB", 413)
+
+        UploadSessions.prune()
+        session_id = uuid.uuid4().hex
+        data_dir = UploadSessions._data_dir(session_id)
+        os.makedirs(data_dir, exist_ok=True)
+        for index in range(len(entries)):
+            open(os.path.join(data_dir, f"{index}.upload"), 'wb').close()
+        session = {
+            'id': session_id, 'kind': kind, 'folder_name': folder_name,
+            'fields': {k: str((fields or {}).get(k, '')) for k in UploadSessions.FIELDS},
+            'files': entries, 'status': 'open', 'job_id': None,
+            'created': time.time(), 'updated': None,
+        }
+        UploadSessions._save(session)
+        return UploadSessions._public(session)
+
+    @staticmethod
+    def get(session_id: str) -> Dict:
+        return UploadSessions._public(UploadSessions._load(session_id))
+
+    @staticmethod
+    def write_chunk(session_id: str, index: int, offset: int, stream: BinaryIO, length: Optional[int]) -> Dict:
+        """Write the request body at `offset` of file `index`. The offset may repeat bytes
+        already received but not leave a gap. Bytes written before a disconnect still count."""
+        if length is not None and length > UploadSessions.MAX_CHUNK_BYTES:
+            raise UploadSessionError(f"單次上傳區塊不可超過 {UploadSessions.MAX_CHUNK_BYTES // (1024 * 1024)} MB", 413)
+        with UploadSessions._lock(session_id):
+            session = UploadSessions._load(session_id)
+        if session['status'] != 'open':
+            raise UploadSessionError("上傳工作階段已完成，無法再寫入", 409, UploadSessions._public(session))
+        if not 0 <= index < len(session['files']):
+            raise UploadSessionError("檔案編號無效", 404, UploadSessions._public(session))
+        entry = session['files'][index]
+        if offset < 0 or offset > entry['received']:
+            raise UploadSessionError(f"位移 {offset} 與已接收的 {entry['received']} 位元組不連續",
+                                     409, UploadSessions._public(session))
+
+        # Stream outside the lock: a slow chunk must not block other files or status polls.
+        written, error = 0, None
+        limit = entry['size'] - offset
+        try:
+            f = open(os.path.join(UploadSessions._data_dir(session_id), f"{index}.upload"), 'r+b')
+        except OSError: # finalized or aborted meanwhile
+            raise UploadSessionError("上傳工作階段已完成，無法再寫入", 409)
+        with f:
+            f.seek(offset)
+            try:
+                while True:
+                    block = stream.read(UploadSessions.BLOCK_SIZE)
+                    if not block:
+                        break
+                    if written + len(block) > limit:
+                        error = UploadSessionError(f"超過宣告的檔案大小 {entry['size']} 位元組", 413)
+                        block = block[:limit - written]
+                    f.write(block)
+                    written += len(block)
+                    if error:
+                        break
+            except Exception as e: # client disconnected mid-chunk
+                print(f"Upload {session_id} file {index} interrupted after {written} bytes: {e}")
+                error = UploadSessionError("上傳中斷，請從已接收的位置繼續", 400)
+
+        with UploadSessions._lock(session_id):
+            session = UploadSessions._load(session_id)
+            entry = session['files'][index]
+            # Only contiguous data counts; a concurrent retry may already have gone further.
+            if session['status'] == 'open' and offset <= entry['received']:
+                entry['received'] = max(entry['received'], offset + written)
+                UploadSessions._save(session)
+        public = UploadSessions._public(session)
+        if error:
+            error.session = public
+            raise error
+        return public
+
+    @staticmethod
+    def finalize(session_id: str) -> Tuple[Dict, Optional[List[SpooledUpload]]]:
+        """Hand the completed files to IngestJobs: the data directory becomes the job's spool
+        directory. Returns (session, spooled files); spooled is None if the session was already
+        finalized (repeating finalize after a lost response returns the same job_id)."""
+        return UploadSessions._hand_over(session_id, 'finalized')
+
+    @staticmethod
+    def claim(session_id: str) -> Tuple[Dict, Optional[List[SpooledUpload]]]:
+        """Like finalize, but for a caller that processes the files itself (a batch create)
+        and removes IngestJobs.SPOOL_DIR/<job_id> afterwards; no ingest job is started."""
+        return UploadSessions._hand_over(session_id, 'claimed')
+
+    @staticmethod
+    def _hand_over(session_id: str, status: str) -> Tuple[Dict, Optional[List[SpooledUpload]]]:
+        with UploadSessions._lock(session_id):
+            session = UploadSessions._load(session_id)
+            if session['status'] != 'open':
+                return UploadSessions._public(session), None
+            missing = [f['name'] for f in session['files'] if f['received'] != f['size']]
+            if missing:
+                raise UploadSessionError(f"尚有 {len(missing)} 個檔案未上傳完成: {', '.join(missing[:5])}",
+                                         409, UploadSessions._public(session))
+            job_id = uuid.uuid4().hex
+            job_dir = os.path.join(IngestJobs.SPOOL_DIR, job_id)
+            os.rename(UploadSessions._data_dir(session_id), job_dir)
+            session['status'], session['job_id'] = status, job_id
+            UploadSessions._save(session)
+        spooled = [SpooledUpload(f['name'], os.path.join(job_dir, f"{i}.upload")) for i, f in enumerate(session['files'])]
+        return UploadSessions._public(session), spooled
+
+    @staticmethod
+    def abort(session_id: str):
+        with UploadSessions._lock(session_id):
+            UploadSessions._load(session_id)
+            UploadSessions._remove(session_id)
+
+    @staticmethod
+    def _remove(session_id: str):
+        shutil.rmtree(UploadSessions._data_dir(session_id), ignore_errors=True)
+        for path in (UploadSessions._meta_path(session_id), os.path.join(UploadSessions.DIR, f"{session_id}.lock")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def prune():
+        """Delete sessions not written to for TTL_SECONDS."""
+        cutoff = time.time() - UploadSessions.TTL_SECONDS
+        try:
+            names = os.listdir(UploadSessions.DIR)
+        except OSError:
+            return
+        for name in names:
+            session_id, ext = os.path.splitext(name)
+            if ext == '.json' and UploadSessions._valid_id(session_id):
+                try:
+                    if os.path.getmtime(os.path.join(UploadSessions.DIR, name)) < cutoff:
+                        UploadSessions._remove(session_id)
+                except OSError:
+                    pass